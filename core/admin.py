@@ -1,24 +1,47 @@
-from django.contrib import admin
-from .models import Post, Comment, Like, Profile, UserPost
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .models import Post, Comment, Like, Profile, Task, UserPost
+from .moderation import moderate, moderation_page, pending_user_posts
+from .search import search_match
+
+
+class FullTextSearchMixin:
+    # Texto pelo índice de busca (core/search.py) em vez de icontains;
+    # search_fields fica só para o admin exibir a caixa de busca.
+    search_username_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        # Direto no queryset do changelist, sem pk__in: o índice é usado uma vez.
+        match = search_match(self.model, search_term)
+        matches = Q(match) if match is not None else Q(pk__in=[])
+        if self.search_username_field:
+            matches |= Q(**{f"{self.search_username_field}__iexact": search_term})
+        return queryset.filter(matches), False
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
-    list_display = ("title", "published", "created_at", "likes_count_display")
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ("title", "published", "created_at", "likes_count", "comments_count")
     list_filter = ("published", "created_at")
     search_fields = ("title", "summary", "content")
     prepopulated_fields = {"slug": ("title",)}
     date_hierarchy = "created_at"
 
-    def likes_count_display(self, obj):
-        return obj.likes.count()
-    likes_count_display.short_description = "Curtidas"
-
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("post", "user", "created_at")
     search_fields = ("content", "user__username")
+    search_username_field = "user__username"
     list_filter = ("created_at",)
 
 
@@ -36,16 +59,79 @@ class ProfileAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserPost)
-class UserPostAdmin(admin.ModelAdmin):
+class UserPostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("title", "user", "created_at", "is_approved")
     list_filter = ("is_approved", "created_at")
     search_fields = ("title", "content", "user__username")
+    search_username_field = "user__username"
+    list_select_related = ("user",)
+    # COUNT(*) da tabela inteira a cada página da lista: desnecessário.
+    show_full_result_count = False
+    readonly_fields = ("moderated_at",)
     actions = ["aprovar_posts", "reprovar_posts"]
 
     @admin.action(description="Aprovar posts selecionados")
     def aprovar_posts(self, request, queryset):
-        queryset.update(is_approved=True)
+        count = moderate(queryset.values_list("pk", flat=True), approve=True)
+        self.message_user(request, f"{count} post(s) aprovado(s).", messages.SUCCESS)
 
     @admin.action(description="Reprovar posts selecionados")
     def reprovar_posts(self, request, queryset):
-        queryset.update(is_approved=False)
+        count = moderate(queryset.values_list("pk", flat=True), approve=False)
+        self.message_user(request, f"{count} post(s) reprovado(s).", messages.SUCCESS)
+
+    # =========================
+    # Fila de moderação (/admin/core/userpost/moderacao/)
+    # =========================
+    def get_urls(self):
+        urls = [
+            path(
+                "moderacao/",
+                self.admin_site.admin_view(self.moderation_view),
+                name="core_userpost_moderation",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def moderation_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        cursor = request.GET.get("cursor")
+
+        if request.method == "POST":
+            ids = [int(pk) for pk in request.POST.getlist("ids") if pk.isdigit()]
+            action = request.POST.get("action")
+            if action not in ("approve", "reject"):
+                messages.error(request, "Ação inválida.")
+            elif ids:
+                count = moderate(ids, approve=action == "approve")
+                verb = "aprovado(s)" if action == "approve" else "reprovado(s)"
+                self.message_user(request, f"{count} post(s) {verb}.", messages.SUCCESS)
+            # Os moderados saem da fila: a mesma página (cursor) mostra os próximos.
+            return redirect(request.get_full_path())
+
+        try:
+            page = moderation_page(cursor)
+        except ValueError:
+            raise Http404("Cursor inválido.")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Fila de moderação",
+            "page": page,
+            "pending_count": pending_user_posts().count(),
+        }
+        return TemplateResponse(request, "admin/core/userpost/moderation.html", context)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "max_attempts", "run_at", "created_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("args", "kwargs", "attempts", "locked_at", "last_error", "created_at")
+    actions = ["tentar_novamente"]
+
+    @admin.action(description="Tentar novamente as tarefas selecionadas")
+    def tentar_novamente(self, request, queryset):
+        queryset.update(status=Task.PENDING, attempts=0, run_at=timezone.now())
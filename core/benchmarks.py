@@ -0,0 +1,222 @@
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.template.backends.django import Template
+from django.test import Client
+from django.urls import reverse
+
+from .feed import feed_page
+from .models import Comment, CommentLike, Like, Post, TimelineEntry, UserPost, UserPostComment, UserPostLike
+from .timelines import build_timeline, timeline_page
+
+BASELINE_PATH = Path(__file__).resolve().parent / "benchmark_baseline.json"
+
+# Tamanhos crescentes do conjunto de dados (cards de cada tipo)
+BENCHMARK_SIZES = (5, 20, 50)
+BENCHMARK_RUNS = 5
+
+# Views que mais pesam em produção: só elas têm a latência comparada com a
+# baseline (as demais variam demais em máquinas diferentes para isso).
+CRITICAL_VIEWS = ("home", "post_detail", "profile", "profiles_list")
+
+
+# =========================
+# Conjunto de dados
+# =========================
+def grow_dataset(size):
+    # Completa o banco até `size` cards de cada tipo (posts com comentários,
+    # respostas e curtidas; postagens da comunidade; perfis).
+    author, _ = User.objects.get_or_create(username="bench_autor")
+    reader, _ = User.objects.get_or_create(username="bench_leitor")
+    start = Post.objects.filter(slug__startswith="bench-").count()
+
+    for i in range(start, size):
+        member = User.objects.create(username=f"bench_membro_{i}")
+        post = Post.objects.create(title=f"Bench {i}", slug=f"bench-{i}", content="texto de benchmark")
+        Like.objects.create(post=post, user=member)
+        root = Comment.objects.create(post=post, user=member, content="comentário")
+        reply = Comment.objects.create(post=post, user=reader, content="resposta", parent=root)
+        CommentLike.objects.create(comment=reply, user=member)
+
+        # Tudo no primeiro post também, para o post_detail crescer com o tamanho
+        first = Post.objects.get(slug="bench-0")
+        Comment.objects.create(post=first, user=member, content=f"comentário {i}")
+        Like.objects.get_or_create(post=first, user=member)
+
+        user_post = UserPost.objects.create(user=author, title=f"Bench {i}", content="texto", is_approved=True)
+        UserPostLike.objects.create(post=user_post, user=member)
+        UserPostComment.objects.create(post=user_post, user=member, content="comentário")
+    return author, reader
+
+
+def benchmark_views(author):
+    post = Post.objects.get(slug="bench-0")
+    comment = Comment.objects.filter(post__slug="bench-1", parent=None).first()
+    return {
+        "home": reverse("feed"),
+        "feed_json": reverse("feed_json"),
+        "post_detail": reverse("post_detail", args=[post.slug]),
+        "comment_replies": reverse("comment_replies", args=[comment.pk]),
+        "profile": reverse("profile", args=[author.username]),
+        "profiles_list": reverse("profiles_list"),
+        "search": reverse("search") + "?q=bench",
+    }
+
+
+# =========================
+# Medição
+# =========================
+@contextmanager
+def _query_timer():
+    # execute_wrapper: o log de connection.queries só tem precisão de 1 ms.
+    timings = []
+
+    def timed_execute(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings.append(time.perf_counter() - started)
+
+    with connection.execute_wrapper(timed_execute):
+        yield timings
+
+
+@contextmanager
+def _render_timer():
+    timings = []
+    original = Template.render
+
+    def timed_render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            timings.append(time.perf_counter() - started)
+
+    with mock.patch.object(Template, "render", timed_render):
+        yield timings
+
+
+def measure(client, url, runs=BENCHMARK_RUNS):
+    # Usuário logado: o cache de páginas de anônimos esconderia o custo real.
+    def request():
+        cache.clear()
+        response = client.get(url)
+        assert response.status_code == 200, f"{url} respondeu {response.status_code}"
+
+    request()  # aquece templates e conexões
+
+    totals, db_times, render_times = [], [], []
+    for _ in range(runs):
+        with _query_timer() as queries, _render_timer() as renders:
+            started = time.perf_counter()
+            request()
+            totals.append(time.perf_counter() - started)
+        db_times.append(sum(queries))
+        render_times.append(sum(renders))
+
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "queries": len(queries),
+        "total_ms": round(statistics.median(totals) * 1000, 2),
+        "db_ms": round(statistics.median(db_times) * 1000, 2),
+        "render_ms": round(statistics.median(render_times) * 1000, 2),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, runs=BENCHMARK_RUNS):
+    # {view: {size: métricas}}
+    results = {}
+    for size in sizes:
+        author, reader = grow_dataset(size)
+        client = Client()
+        client.force_login(reader)
+        for name, url in benchmark_views(author).items():
+            results.setdefault(name, {})[size] = measure(client, url, runs)
+    return results
+
+
+# =========================
+# Timeline pré-calculada x merge do feed
+# =========================
+def measure_call(func, runs=BENCHMARK_RUNS):
+    func()
+    totals = []
+    for _ in range(runs):
+        with _query_timer() as queries:
+            started = time.perf_counter()
+            func()
+            totals.append(time.perf_counter() - started)
+    return {"queries": len(queries), "total_ms": round(statistics.median(totals) * 1000, 2)}
+
+
+def run_timeline_benchmarks(sizes=BENCHMARK_SIZES, runs=BENCHMARK_RUNS):
+    # Só a montagem da página (sem template): {"merge"|"timeline": {size: métricas}}
+    results = {"merge": {}, "timeline": {}}
+    for size in sizes:
+        _, reader = grow_dataset(size)
+        TimelineEntry.objects.filter(user=reader).delete()
+        build_timeline(reader.pk)
+        results["merge"][size] = measure_call(feed_page, runs)
+        results["timeline"][size] = measure_call(lambda: timeline_page(reader), runs)
+    return results
+
+
+# =========================
+# Baseline e regressões
+# =========================
+def load_baseline(path=BASELINE_PATH):
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    # Guarda o maior tamanho de cada view: é onde N+1 e lentidão aparecem.
+    baseline = {}
+    for name, by_size in results.items():
+        metrics = by_size[max(by_size)]
+        baseline[name] = {"queries": metrics["queries"], "total_ms": metrics["total_ms"]}
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def find_regressions(results, baseline, tolerance=2.0, slack_ms=25.0, check_latency=True):
+    # check_latency=False: só consultas (N+1 e baseline), estável em qualquer
+    # máquina; os tempos ficam para o "manage.py benchmark".
+    problems = []
+    for name, by_size in results.items():
+        sizes = sorted(by_size)
+        smallest, largest = by_size[sizes[0]], by_size[sizes[-1]]
+        if largest["queries"] > smallest["queries"]:
+            problems.append(
+                f"{name}: {smallest['queries']} -> {largest['queries']} consultas "
+                f"de {sizes[0]} para {sizes[-1]} cards (N+1)"
+            )
+
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if largest["queries"] > expected["queries"]:
+            problems.append(f"{name}: {largest['queries']} consultas (baseline {expected['queries']})")
+        if not check_latency or name not in CRITICAL_VIEWS:
+            continue
+        limit = expected["total_ms"] * tolerance + slack_ms
+        if largest["total_ms"] > limit:
+            problems.append(f"{name}: {largest['total_ms']} ms (baseline {expected['total_ms']} ms, limite {limit:.0f})")
+    return problems
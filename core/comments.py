@@ -0,0 +1,54 @@
+from .cursors import akeyset_page, keyset_page
+
+COMMENTS_PAGE_SIZE = 20
+REPLIES_PAGE_SIZE = 20
+
+
+# =========================
+# Árvore de comentários
+# =========================
+def build_comment_tree(comments):
+    # O(n): indexa por id e liga cada comentário ao pai numa única passada.
+    # Funciona para Comment e UserPostComment (ambos têm parent/replies).
+    nodes = {}
+    for comment in comments:
+        comment.children = []
+        nodes[comment.pk] = comment
+
+    roots = []
+    for comment in comments:
+        parent = nodes.get(comment.parent_id)
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent.children.append(comment)
+    return roots
+
+
+# =========================
+# Páginas de comentários (keyset em core/cursors.py)
+# =========================
+def _top_level(model, post):
+    # Mais recentes primeiro; as respostas são carregadas sob demanda.
+    return model.objects.filter(post=post, parent__isnull=True).select_related("user")
+
+
+def _replies(parent):
+    # Respostas em ordem cronológica, filtrando por post para usar o índice (post, parent, created_at).
+    return type(parent).objects.filter(post_id=parent.post_id, parent=parent).select_related("user")
+
+
+def top_level_comments(model, post, cursor=None, size=COMMENTS_PAGE_SIZE):
+    return keyset_page(_top_level(model, post), cursor, size, newest_first=True)
+
+
+def replies_page(parent, cursor=None, size=REPLIES_PAGE_SIZE):
+    return keyset_page(_replies(parent), cursor, size, newest_first=False)
+
+
+async def atop_level_comments(model, post, cursor=None, size=COMMENTS_PAGE_SIZE):
+    return await akeyset_page(_top_level(model, post), cursor, size, newest_first=True)
+
+
+async def areplies_page(parent, cursor=None, size=REPLIES_PAGE_SIZE):
+    return await akeyset_page(_replies(parent), cursor, size, newest_first=False)
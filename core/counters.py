@@ -0,0 +1,56 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, CommentLike, Like, Post, UserPost, UserPostComment, UserPostLike
+
+# (modelo contado, FK para o alvo, modelo alvo, campo contador)
+COUNTERS = (
+    (Like, "post", Post, "likes_count"),
+    (Comment, "post", Post, "comments_count"),
+    (UserPostLike, "post", UserPost, "likes_count"),
+    (UserPostComment, "post", UserPost, "comments_count"),
+    (CommentLike, "comment", Comment, "likes_count"),
+    (Comment, "parent", Comment, "replies_count"),
+)
+
+COUNTED_MODELS = {source for source, _, _, _ in COUNTERS}
+
+
+# =========================
+# Atualização incremental
+# =========================
+def adjust_counters(instance, delta):
+    for source, fk, target, field in COUNTERS:
+        if type(instance) is not source:
+            continue
+        target_id = getattr(instance, f"{fk}_id")
+        if target_id is None:
+            continue
+        qs = target.objects.filter(pk=target_id)
+        if delta < 0:
+            # Nunca fica negativo; eventuais desvios são corrigidos pelo recount_counters.
+            qs = qs.filter(**{f"{field}__gte": -delta})
+        qs.update(**{field: F(field) + delta})
+
+
+# =========================
+# Recontagem em lote
+# =========================
+def counted_rows(source, fk):
+    counts = (
+        source.objects.filter(**{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def recount_counters():
+    repaired = {}
+    for source, fk, target, field in COUNTERS:
+        # Um UPDATE por contador, tocando só as linhas divergentes.
+        drifted = target.objects.annotate(real_count=counted_rows(source, fk)).exclude(**{field: F("real_count")})
+        repaired[f"{target.__name__}.{field}"] = drifted.update(**{field: counted_rows(source, fk)})
+    return repaired
@@ -0,0 +1,63 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from django.db.models import Q
+
+KeysetPage = namedtuple("KeysetPage", ["items", "next_cursor"])
+
+
+# =========================
+# Cursores opacos para paginação por keyset
+# =========================
+def encode_cursor(*parts):
+    raw = "|".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, *parsers):
+    # Ex.: decode_cursor(c, datetime.fromisoformat, int) -> (created_at, id)
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        if len(parts) != len(parsers):
+            raise ValueError
+        return tuple(parse(part) for parse, part in zip(parsers, parts))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Cursor inválido.") from exc
+
+
+# =========================
+# Paginação por keyset (created_at, id)
+# =========================
+# Para qualquer modelo com created_at; usada pelos comentários e pela fila
+# de moderação. select_related e filtros ficam com quem chama.
+def _keyset_queryset(qs, cursor, size, newest_first):
+    position = decode_cursor(cursor, datetime.fromisoformat, int)
+    if position:
+        created_at, pk = position
+        if newest_first:
+            qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        else:
+            qs = qs.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+    order = ("-created_at", "-id") if newest_first else ("created_at", "id")
+    return qs.order_by(*order)[: size + 1]
+
+
+def _keyset_result(items, size):
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].pk)
+    return KeysetPage(items, next_cursor)
+
+
+def keyset_page(qs, cursor, size, newest_first=True):
+    return _keyset_result(list(_keyset_queryset(qs, cursor, size, newest_first)), size)
+
+
+async def akeyset_page(qs, cursor, size, newest_first=True):
+    return _keyset_result([item async for item in _keyset_queryset(qs, cursor, size, newest_first)], size)
@@ -0,0 +1,39 @@
+from allauth.account.adapter import DefaultAccountAdapter
+from allauth.core import context as allauth_context
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.mail import EmailMultiAlternatives
+
+from .tasks import task
+
+
+# =========================
+# Envio de e-mails pela fila
+# =========================
+@task(max_attempts=5, backoff=60)
+def send_email(subject, body, from_email, to, alternatives=(), headers=None):
+    message = EmailMultiAlternatives(subject, body, from_email, to, headers=headers)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    message.send()
+
+
+class AccountAdapter(DefaultAccountAdapter):
+    # Os templates do allauth são renderizados na requisição (precisam do
+    # request e do site); só o envio SMTP, lento e sujeito a falha, vai para a fila.
+    def send_mail(self, template_prefix, email, context):
+        request = allauth_context.request
+        ctx = {
+            "request": request,
+            "email": email,
+            "current_site": get_current_site(request),
+        }
+        ctx.update(context)
+        message = self.render_mail(template_prefix, email, ctx)
+        send_email.delay(
+            message.subject,
+            message.body,
+            message.from_email,
+            message.to,
+            alternatives=[list(alternative) for alternative in getattr(message, "alternatives", [])],
+            headers=message.extra_headers or None,
+        )
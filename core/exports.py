@@ -0,0 +1,105 @@
+import csv
+import json
+from datetime import datetime, time
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.utils import timezone
+
+from .models import Comment, CommentLike, Like, Post, UserPost, UserPostComment, UserPostLike
+
+# Linhas por ida ao banco; no PostgreSQL o iterator usa um cursor no
+# servidor, então a memória não cresce com o tamanho da tabela.
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# Início de célula que planilhas interpretam como fórmula (CSV injection)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Tabela -> (modelo, colunas). Só colunas (values_list): nada de instanciar modelos.
+EXPORTS = {
+    "posts": (Post, ["id", "slug", "title", "published", "created_at", "updated_at", "likes_count", "comments_count"]),
+    "user_posts": (UserPost, [
+        "id", "user_id", "user__username", "title", "is_approved", "moderated_at",
+        "created_at", "updated_at", "likes_count", "comments_count",
+    ]),
+    "comments": (Comment, ["id", "post_id", "parent_id", "user_id", "user__username", "content", "created_at", "likes_count", "replies_count"]),
+    "user_post_comments": (UserPostComment, ["id", "post_id", "parent_id", "user_id", "user__username", "content", "created_at"]),
+    "likes": (Like, ["id", "post_id", "user_id", "created_at"]),
+    "comment_likes": (CommentLike, ["id", "comment_id", "user_id", "created_at"]),
+    "user_post_likes": (UserPostLike, ["id", "post_id", "user_id", "created_at"]),
+}
+
+
+def parse_day(value):
+    # "2025-01-31" -> início do dia no fuso do site; vazio -> None
+    if not value:
+        return None
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Data inválida: {value!r} (use AAAA-MM-DD).")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(table, since=None, until=None):
+    # since inclusivo, until exclusivo (created_at)
+    if table not in EXPORTS:
+        raise ValueError(f"Tabela desconhecida: {table!r}.")
+    model, fields = EXPORTS[table]
+    rows = model.objects.order_by("pk")
+    if since:
+        rows = rows.filter(created_at__gte=since)
+    if until:
+        rows = rows.filter(created_at__lt=until)
+    # O banco é escolhido aqui: numa resposta em streaming o gerador roda
+    # depois que a view retornou (fora do read_from_replica).
+    return rows.using(router.db_for_read(model)).values_list(*fields), fields
+
+
+# =========================
+# Formatos (um pedaço de texto por linha)
+# =========================
+class _Echo:
+    # "Arquivo" do csv.writer que devolve a linha em vez de guardá-la
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    # Texto vindo de usuários: "=HYPERLINK(...)" vira texto, não fórmula.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def _jsonl_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def export_lines(queryset, fields, fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato desconhecido: {fmt!r}.")
+    rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return _csv_lines(rows, fields) if fmt == "csv" else _jsonl_lines(rows, fields)
+
+
+async def aexport_lines(lines):
+    # No ASGI, um iterador síncrono no StreamingHttpResponse é lido inteiro
+    # com sync_to_async(list) antes do envio. Aqui cada ida à thread do ORM
+    # (sempre a mesma, então o cursor continua aberto) traz um lote.
+    lines = iter(lines)
+    next_chunk = sync_to_async(lambda: "".join(islice(lines, EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        yield chunk
@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Prefetch, Q, aprefetch_related_objects, prefetch_related_objects
+from django.urls import reverse
+
+from .comments import build_comment_tree
+from .cursors import decode_cursor, encode_cursor
+from .likes import amark_liked, mark_liked
+from .models import Comment, Like, Post, UserPost, UserPostComment, UserPostLike
+
+FEED_PAGE_SIZE = 20
+
+FeedPage = namedtuple("FeedPage", ["items", "next_cursor"])
+
+
+# =========================
+# Comentários em lote
+# =========================
+def _comment_order(comment):
+    return comment.created_at, comment.pk
+
+
+def _comment_prefetches():
+    return (
+        Prefetch("comments", queryset=Comment.objects.select_related("user")),
+        Prefetch("comments", queryset=UserPostComment.objects.select_related("user")),
+    )
+
+
+def _attach_comment_trees(objects):
+    for obj in objects:
+        obj.comment_tree = build_comment_tree(sorted(obj.comments.all(), key=_comment_order))
+
+
+def prefetch_comments(posts, user_posts):
+    # Uma consulta por tipo de post para a página inteira, já com os autores.
+    # A ordem é feita aqui: o IN (...) de vários posts não tem índice que
+    # evite o sort no banco, e cada lista é pequena.
+    post_comments, user_post_comments = _comment_prefetches()
+    prefetch_related_objects(posts, post_comments)
+    prefetch_related_objects(user_posts, user_post_comments)
+    _attach_comment_trees([*posts, *user_posts])
+
+
+async def aprefetch_comments(posts, user_posts):
+    post_comments, user_post_comments = _comment_prefetches()
+    await asyncio.gather(
+        aprefetch_related_objects(posts, post_comments),
+        aprefetch_related_objects(user_posts, user_post_comments),
+    )
+    _attach_comment_trees([*posts, *user_posts])
+
+
+# =========================
+# Fontes do feed
+# =========================
+# Cada fonte é um queryset ordenado por (-created_at, -id). O "type" também
+# entra no cursor e desempata itens criados no mesmo instante.
+def _official_posts():
+    return Post.objects.filter(published=True)
+
+
+def _user_posts():
+    return UserPost.objects.filter(is_approved=True).select_related("user__profile")
+
+
+FEED_SOURCES = (
+    ("oficial", _official_posts),
+    ("usuario", _user_posts),
+)
+
+
+# =========================
+# Cursor (created_at, type, id)
+# =========================
+def _item_key(item):
+    return item["obj"].created_at, item["type"], item["obj"].pk
+
+
+def _after_cursor(qs, kind, cursor):
+    # Itens "depois" do cursor têm chave (created_at, type, id) menor que a dele.
+    if cursor is None:
+        return qs
+    created_at, cursor_kind, cursor_id = cursor
+    if kind < cursor_kind:
+        return qs.filter(created_at__lte=created_at)
+    if kind > cursor_kind:
+        return qs.filter(created_at__lt=created_at)
+    return qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=cursor_id))
+
+
+# =========================
+# Página do feed
+# =========================
+def _source_page(kind, source, position, size):
+    # Cada fonte contribui no máximo size + 1 linhas; o merge é feito sobre
+    # listas já ordenadas, então o custo da página não depende do histórico.
+    return _after_cursor(source(), kind, position).order_by("-created_at", "-id")[: size + 1]
+
+
+def _merge_streams(streams, size):
+    merged = heapq.merge(*streams, key=_item_key, reverse=True)
+    items = list(islice(merged, size + 1))
+
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(*_item_key(items[-1]))
+    return items, next_cursor
+
+
+def _split_by_type(items):
+    return (
+        [item["obj"] for item in items if item["type"] == "oficial"],
+        [item["obj"] for item in items if item["type"] == "usuario"],
+    )
+
+
+def feed_page(cursor=None, size=FEED_PAGE_SIZE):
+    position = decode_cursor(cursor, datetime.fromisoformat, str, int)
+    streams = [
+        [{"type": kind, "obj": obj} for obj in _source_page(kind, source, position, size)]
+        for kind, source in FEED_SOURCES
+    ]
+    items, next_cursor = _merge_streams(streams, size)
+    prefetch_comments(*_split_by_type(items))
+    return FeedPage(items, next_cursor)
+
+
+async def _afetch_stream(kind, qs):
+    return [{"type": kind, "obj": obj} async for obj in qs]
+
+
+async def afeed_page(cursor=None, size=FEED_PAGE_SIZE):
+    # Igual a feed_page, com as fontes (e depois os comentários) consultadas juntas.
+    position = decode_cursor(cursor, datetime.fromisoformat, str, int)
+    streams = await asyncio.gather(*(
+        _afetch_stream(kind, _source_page(kind, source, position, size)) for kind, source in FEED_SOURCES
+    ))
+    items, next_cursor = _merge_streams(streams, size)
+    await aprefetch_comments(*_split_by_type(items))
+    return FeedPage(items, next_cursor)
+
+
+def mark_feed_likes(user, items):
+    posts, user_posts = _split_by_type(items)
+    mark_liked(Like, user, posts)
+    mark_liked(UserPostLike, user, user_posts)
+
+
+async def amark_feed_likes(user, items):
+    posts, user_posts = _split_by_type(items)
+    await asyncio.gather(amark_liked(Like, user, posts), amark_liked(UserPostLike, user, user_posts))
+
+
+def serialize_feed_item(item):
+    obj = item["obj"]
+    data = {
+        "type": item["type"],
+        "id": obj.pk,
+        "title": obj.title,
+        "created_at": obj.created_at.isoformat(),
+        "likes_count": obj.likes_count,
+        "liked": getattr(obj, "liked_by_me", False),
+        "comments_count": obj.comments_count,
+    }
+    if item["type"] == "oficial":
+        data.update(
+            url=reverse("post_detail", kwargs={"slug": obj.slug}),
+            summary=obj.summary,
+            image=obj.cover.url if obj.cover else None,
+        )
+    else:
+        data.update(
+            url=reverse("profile", kwargs={"username": obj.user.username}),
+            author=obj.user.username,
+            content=obj.content,
+            image=obj.image.url if obj.image else None,
+            embed_url=obj.embed_url,
+        )
+    return data
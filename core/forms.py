@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from .models import Profile, UserPost, AVATAR_DEFAULT
+from .uploads import validate_upload
 
 
 # ========================
@@ -103,12 +104,36 @@ class ProfileForm(forms.ModelForm):
 # Formulário de postagens de usuários
 # ========================
 class UserPostForm(forms.ModelForm):
+    # Preenchido quando a imagem foi enviada direto para o bucket (upload pré-assinado)
+    image_key = forms.CharField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = UserPost
         fields = ["title", "content", "image", "embed_url"]
 
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop("user", None)
+        super().__init__(*args, **kwargs)
+
+    def clean_image_key(self):
+        key = self.cleaned_data.get("image_key", "").strip()
+        if not key:
+            return key
+        try:
+            return validate_upload(self.user, key)
+        except ValueError as exc:
+            raise forms.ValidationError(str(exc))
+
+    def save(self, commit=True):
+        post = super().save(commit=False)
+        if self.cleaned_data.get("image_key"):
+            post.image.name = self.cleaned_data["image_key"]
+        if commit:
+            post.save()
+        return post
+
     def clean_embed_url(self):
-        url = self.cleaned_data.get("embed_url", "").strip()
+        url = (self.cleaned_data.get("embed_url") or "").strip()
         if not url:
             return url
 
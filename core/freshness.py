@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.db.models import Max
+
+from .models import Post, Profile, UserPost
+
+
+# =========================
+# Última modificação por página (uma agregação por view)
+# =========================
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def feed_last_modified():
+    posts = Post.objects.filter(published=True).aggregate(latest=Max("updated_at"))
+    user_posts = UserPost.objects.filter(is_approved=True).aggregate(latest=Max("updated_at"))
+    return _latest(posts["latest"], user_posts["latest"])
+
+
+def post_last_modified(slug):
+    latest = Post.objects.filter(slug=slug, published=True).aggregate(
+        post=Max("updated_at"),
+        comment=Max("comments__created_at"),
+    )
+    return _latest(latest["post"], latest["comment"])
+
+
+def profile_last_modified(username):
+    latest = User.objects.filter(username=username).aggregate(
+        profile=Max("profile__updated_at"),
+        posts=Max("user_posts__updated_at"),
+    )
+    return _latest(latest["profile"], latest["posts"])
+
+
+def profiles_last_modified():
+    return Profile.objects.aggregate(latest=Max("updated_at"))["latest"]
@@ -0,0 +1,92 @@
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .tasks import task
+
+RENDITION_WIDTHS = (480, 960, 1600)
+RENDITION_FORMATS = (("webp", "WEBP", "webp"), ("jpeg", "JPEG", "jpg"))
+
+
+# =========================
+# Fila de processamento (fora da requisição, via core/tasks.py)
+# =========================
+def schedule_renditions(instance, field_name):
+    field = getattr(instance, field_name)
+    renditions_field = f"{field_name}_renditions"
+    renditions = getattr(instance, renditions_field)
+
+    if not field:
+        if renditions:
+            # Imagem removida: volta a não ter versões.
+            type(instance).objects.filter(pk=instance.pk).update(**{renditions_field: {}})
+        return
+    if renditions.get("source") == field.name:
+        return
+
+    build_renditions.delay(instance._meta.label, instance.pk, field_name)
+
+
+# =========================
+# Geração das versões (WebP/JPEG, sem EXIF)
+# =========================
+def _encode(image, fmt):
+    if fmt == "JPEG":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.mode in ("LA", "P") else "RGB")
+    buffer = BytesIO()
+    # Sem exif=...: os metadados do original (GPS, câmera) não são copiados.
+    image.save(buffer, format=fmt, quality=80)
+    return ContentFile(buffer.getvalue())
+
+
+def _render(field, source):
+    with field.storage.open(source, "rb") as fh:
+        image = Image.open(fh)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    base = posixpath.splitext(source)[0]
+    widths = [width for width in RENDITION_WIDTHS if width < image.width] or [image.width]
+    renditions = {"source": source, "width": image.width}
+    for key, fmt, ext in RENDITION_FORMATS:
+        renditions[key] = {}
+        for width in widths:
+            resized = image.copy()
+            resized.thumbnail((width, image.height))
+            name = field.storage.save(f"renditions/{base}-{width}.{ext}", _encode(resized, fmt))
+            renditions[key][str(width)] = name
+    return renditions
+
+
+@task(max_attempts=3)
+def build_renditions(model_label, pk, field_name):
+    model = apps.get_model(model_label)
+    obj = model.objects.filter(pk=pk).first()
+    field = getattr(obj, field_name, None)
+    if not field:
+        return
+
+    source = field.name
+    try:
+        renditions = _render(field, source)
+    except Exception:
+        # Marca o original como falho: o template segue servindo o arquivo
+        # original e schedule_renditions não reenfileira a mesma imagem.
+        # O erro sobe para o worker (novas tentativas / last_error).
+        model.objects.filter(pk=pk, **{field_name: source}).update(
+            **{f"{field_name}_renditions": {"source": source, "failed": True}}
+        )
+        raise
+
+    # A imagem pode ter sido trocada enquanto processávamos.
+    obj.refresh_from_db()
+    if getattr(obj, field_name).name != source:
+        return
+    setattr(obj, f"{field_name}_renditions", renditions)
+    # save() atualiza updated_at (fragmentos) e dispara a invalidação das páginas.
+    obj.save(update_fields=[f"{field_name}_renditions", "updated_at"])
@@ -0,0 +1,92 @@
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connections, router, transaction
+
+from .counters import COUNTERS, adjust_counters
+from .pagecache import invalidate, page_scopes
+
+
+# =========================
+# Curtir/descurtir
+# =========================
+def _like_counter(like_model):
+    for source, fk, target, field in COUNTERS:
+        if source is like_model:
+            return fk, target, field
+    raise ValueError(f"{like_model.__name__} não tem contador de curtidas.")
+
+
+def _delete_like(like_model, fk, user, obj):
+    # Um único DELETE. O delete() do ORM passaria pelo Collector (SELECT,
+    # DELETE por pk e signals por linha, que recarregam o alvo para invalidar).
+    db = connections[router.db_for_write(like_model)]
+    table = db.ops.quote_name(like_model._meta.db_table)
+    column = db.ops.quote_name(like_model._meta.get_field(fk).column)
+    with db.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE user_id = %s AND {column} = %s", [user.pk, obj.pk])
+        return cursor.rowcount
+
+
+def set_like(like_model, user, obj, liked=None):
+    # liked=True/False é o estado desejado: repetir a requisição (retry,
+    # clique duplo) não desfaz nada. None alterna, para clientes antigos.
+    # obj precisa vir com o que a invalidação lê (CommentLike: comment.post;
+    # UserPostLike: post.user), senão os signals buscam no banco.
+    fk, target, field = _like_counter(like_model)
+    like = like_model(user=user, **{fk: obj})
+    with transaction.atomic():
+        if liked is None:
+            liked = not like_model.objects.filter(user=user, **{fk: obj}).exists()
+        if liked:
+            try:
+                with transaction.atomic():
+                    like.save()  # contador e invalidação pelos signals
+            except IntegrityError:
+                pass  # já curtido (reenvio ou clique concorrente)
+        elif _delete_like(like_model, fk, user, obj):
+            # Sem post_delete: o que os signals fariam vai explícito aqui.
+            adjust_counters(like, -1)
+            invalidate(*page_scopes(like))
+        count = target.objects.values_list(field, flat=True).get(pk=obj.pk)
+    return liked, count
+
+
+def desired_like(request):
+    # Campo "liked" dos formulários de curtida: "true"/"false"; ausente, alterna.
+    return {"true": True, "false": False}.get(request.POST.get("liked"))
+
+
+# O ORM async ainda não tem transações: a troca inteira roda numa thread.
+aset_like = sync_to_async(set_like)
+
+
+# =========================
+# "Curtido por mim" em lote
+# =========================
+# Uma consulta por modelo de curtida para a página inteira, pelo índice
+# único (alvo, usuário); o template lê obj.liked_by_me em O(1) por card.
+def _liked_queryset(like_model, user, objects):
+    ids = {obj.pk for obj in objects}
+    if not ids or not user.is_authenticated:
+        return None
+    fk, _, _ = _like_counter(like_model)
+    return like_model.objects.filter(user=user, **{f"{fk}__in": ids}).values_list(f"{fk}_id", flat=True)
+
+
+def _mark(objects, liked):
+    for obj in objects:
+        obj.liked_by_me = obj.pk in liked
+    return liked
+
+
+def mark_liked(like_model, user, objects):
+    qs = _liked_queryset(like_model, user, objects)
+    return _mark(objects, set(qs) if qs is not None else set())
+
+
+async def amark_liked(like_model, user, objects):
+    qs = _liked_queryset(like_model, user, objects)
+    return _mark(objects, {pk async for pk in qs} if qs is not None else set())
+
+
+def wants_json(request):
+    return "application/json" in request.headers.get("Accept", "")
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmarks import (
+    BENCHMARK_RUNS,
+    BENCHMARK_SIZES,
+    CRITICAL_VIEWS,
+    find_regressions,
+    load_baseline,
+    run_benchmarks,
+    run_timeline_benchmarks,
+    save_baseline,
+)
+
+# O manifest do collectstatic não existe fora do deploy.
+BENCHMARK_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede consultas, tempo de banco, de template, total e pico de memória de cada view "
+        "com bancos de tamanho crescente e compara com a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=list(BENCHMARK_SIZES))
+        parser.add_argument("--runs", type=int, default=BENCHMARK_RUNS)
+        parser.add_argument("--tolerance", type=float, default=2.0,
+                            help="Quantas vezes a latência da baseline é aceita antes de falhar.")
+        parser.add_argument("--update-baseline", action="store_true")
+        parser.add_argument("--timelines", action="store_true",
+                            help="Compara a timeline pré-calculada com o merge do feed e sai.")
+
+    def handle(self, *args, **options):
+        # Banco de teste descartável, como no manage.py test.
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(STORAGES=BENCHMARK_STORAGES, REPLICA_DATABASES=[]):
+                if options["timelines"]:
+                    results = run_timeline_benchmarks(sorted(options["sizes"]), options["runs"])
+                else:
+                    results = run_benchmarks(sorted(options["sizes"]), options["runs"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options["timelines"]:
+            self.report_timelines(results)
+            return
+        self.report(results)
+
+        if options["update_baseline"]:
+            save_baseline(results)
+            self.stdout.write(self.style.SUCCESS("Baseline atualizada."))
+            return
+
+        problems = find_regressions(results, load_baseline(), tolerance=options["tolerance"])
+        if problems:
+            raise CommandError("Regressões encontradas:\n" + "\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("Sem regressões."))
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'view':<18}{'cards':>6}{'consultas':>11}{'total ms':>10}{'db ms':>9}{'template ms':>13}{'pico KB':>10}"
+        )
+        names = [*CRITICAL_VIEWS, *sorted(set(results) - set(CRITICAL_VIEWS))]
+        for name in names:
+            for size, metrics in sorted(results[name].items()):
+                self.stdout.write(
+                    f"{name:<18}{size:>6}{metrics['queries']:>11}{metrics['total_ms']:>10}"
+                    f"{metrics['db_ms']:>9}{metrics['render_ms']:>13}{metrics['peak_kb']:>10}"
+                )
+
+    def report_timelines(self, results):
+        self.stdout.write(f"{'cards':>6}{'merge consultas':>17}{'merge ms':>10}{'timeline consultas':>20}{'timeline ms':>13}")
+        for size in sorted(results["merge"]):
+            merge, timeline = results["merge"][size], results["timeline"][size]
+            self.stdout.write(
+                f"{size:>6}{merge['queries']:>17}{merge['total_ms']:>10}"
+                f"{timeline['queries']:>20}{timeline['total_ms']:>13}"
+            )
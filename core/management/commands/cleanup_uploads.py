@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.uploads import delete_orphan_uploads, direct_uploads_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga do bucket as imagens enviadas por URL pré-assinada que nenhuma postagem usa "
+        "(rodar periodicamente, por exemplo uma vez por dia)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-hours", type=int, default=24)
+
+    def handle(self, *args, **options):
+        if not direct_uploads_enabled():
+            raise CommandError("Upload direto desligado (USE_S3): não há bucket para limpar.")
+        deleted = delete_orphan_uploads(timedelta(hours=options["older_than_hours"]))
+        self.stdout.write(self.style.SUCCESS(f"{deleted} envio(s) órfão(s) apagado(s)."))
@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .loadtest import Command as LoadTest, percentile
+
+# Mesma variável que o gunicorn.conf.py usa para escolher worker e aplicação.
+SERVERS = {
+    "wsgi": {"ASYNC_VIEWS": "False"},
+    "asgi": {"ASYNC_VIEWS": "True"},
+}
+
+
+# =========================
+# Memória (RSS do master + workers, via /proc)
+# =========================
+def _children(pid):
+    children = []
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children += [int(child) for child in (task / "children").read_text().split()]
+        except OSError:
+            pass
+    return children
+
+
+def _tree_rss_kb(pid):
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            status = Path(f"/proc/{current}/status").read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmRSS:"):
+                total += int(line.split()[1])
+        pending += _children(current)
+    return total
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, _tree_rss_kb(self.pid))
+
+
+class Command(BaseCommand):
+    help = (
+        "Sobe o gunicorn em WSGI (workers síncronos) e em ASGI (workers uvicorn com as views "
+        "assíncronas), roda o mesmo loadtest contra cada um e compara vazão, latência e memória."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", nargs="+", choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--logged-in", type=float, default=0.3)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not sys.platform.startswith("linux"):
+            raise CommandError("A medição de memória lê /proc: rode no Linux.")
+
+        summary = {}
+        for name in options["servers"]:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name} =="))
+            summary[name] = self.measure(name, options)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'servidor':<10}{'reqs':>8}{'erros':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'pico MB':>10}")
+        for name, row in summary.items():
+            self.stdout.write(
+                f"{name:<10}{row['requests']:>8}{row['errors']:>8}{row['rps']:>10.1f}"
+                f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['peak_mb']:>10.1f}"
+            )
+
+    def measure(self, name, options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{options['port']}",
+             "--workers", str(options["workers"]), "--log-level", "warning"],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **SERVERS[name]},
+        )
+        sampler = MemorySampler(server.pid)
+        try:
+            self.wait_until_ready(server, base_url)
+            sampler.start()
+            loadtest = LoadTest(stdout=self.stdout, stderr=self.stderr)
+            timings, errors, wall = loadtest.run({
+                "base_url": base_url,
+                "requests": options["requests"],
+                "concurrency": options["concurrency"],
+                "logged_in": options["logged_in"],
+                "sample": 500,
+                "seed": options["seed"],
+            })
+            loadtest.report(timings, errors, wall)
+        finally:
+            sampler.stopped.set()
+            server.terminate()
+            server.wait(timeout=30)
+
+        values = sorted(value * 1000 for kind_values in timings.values() for value in kind_values)
+        return {
+            "requests": len(values),
+            "errors": sum(errors.values()),
+            "rps": len(values) / wall,
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "peak_mb": sampler.peak_kb / 1024,
+        }
+
+    def wait_until_ready(self, server, base_url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"O servidor saiu com código {server.returncode}.")
+            try:
+                with urllib.request.urlopen(f"{base_url}/feed.json", timeout=5):
+                    return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.3)
+        raise CommandError(f"O servidor não respondeu em {timeout}s.")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import EXPORT_FORMATS, EXPORTS, export_lines, export_queryset, parse_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta uma tabela (posts, comentários, curtidas) em CSV ou JSONL, linha a linha, "
+        "sem carregar a tabela na memória. Datas no fuso do site; --until é exclusivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=list(EXPORTS))
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--since", help="AAAA-MM-DD (inclusivo)")
+        parser.add_argument("--until", help="AAAA-MM-DD (exclusivo)")
+        parser.add_argument("--output", "-o", help="Arquivo de saída (padrão: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            queryset, fields = export_queryset(
+                options["table"], parse_day(options["since"]), parse_day(options["until"])
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        # newline="": o csv já escreve \r\n
+        output = open(options["output"], "w", encoding="utf-8", newline="") if options["output"] else None
+        lines = 0
+        try:
+            for line in export_lines(queryset, fields, options["format"]):
+                if output:
+                    output.write(line)
+                else:
+                    self.stdout.write(line, ending="")
+                lines += 1
+        finally:
+            if output:
+                output.close()
+        if output:
+            self.stderr.write(f"{lines} linha(s) gravada(s) em {options['output']}.")
@@ -0,0 +1,144 @@
+import random
+import secrets
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Post
+
+# Peso de cada tipo de requisição no tráfego simulado
+TRAFFIC_MIX = {
+    "feed": 50,
+    "post": 25,
+    "profile": 15,
+    "like": 10,
+}
+
+
+def percentile(values, pct):
+    # Nearest-rank sobre a lista já ordenada
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Reproduz um mix de tráfego (feed, post, perfil, curtida) contra um servidor local "
+        "e mostra latência p50/p95/p99 e vazão por endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--logged-in", type=float, default=0.3,
+                            help="Fração das requisições de leitura feitas por usuários logados.")
+        parser.add_argument("--sample", type=int, default=500, help="Posts/usuários sorteados do banco.")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        timings, errors, wall = self.run(options)
+        self.report(timings, errors, wall)
+
+    def run(self, options):
+        self.base_url = options["base_url"].rstrip("/")
+        self.rng = random.Random(options["seed"])
+        self.logged_in = options["logged_in"]
+
+        self.posts = list(
+            Post.objects.filter(published=True).order_by("?").values_list("pk", "slug")[: options["sample"]]
+        )
+        self.usernames = list(
+            User.objects.filter(is_active=True).order_by("?").values_list("username", flat=True)[: options["sample"]]
+        )
+        if not self.posts or not self.usernames:
+            raise CommandError("Banco sem posts ou usuários; rode antes: python manage.py seed_data")
+        self.sessions = [self.login(username) for username in self.usernames[:50]]
+
+        kinds = self.rng.choices(list(TRAFFIC_MIX), weights=list(TRAFFIC_MIX.values()), k=options["requests"])
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for kind, elapsed, ok in pool.map(self.hit, kinds):
+                timings[kind].append(elapsed)
+                if not ok:
+                    errors[kind] += 1
+        wall = time.perf_counter() - started
+        return timings, errors, wall
+
+    # =========================
+    # Sessões (sem passar pelo formulário de login)
+    # =========================
+    def login(self, username):
+        user = User.objects.get(username=username)
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        csrf = secrets.token_hex(16)
+        return {
+            "Cookie": f"{settings.SESSION_COOKIE_NAME}={session.session_key}; {settings.CSRF_COOKIE_NAME}={csrf}",
+            "X-CSRFToken": csrf,
+        }
+
+    # =========================
+    # Requisições
+    # =========================
+    def build_request(self, kind):
+        headers = {}
+        if kind == "like" or self.rng.random() < self.logged_in:
+            headers.update(self.rng.choice(self.sessions))
+
+        if kind == "feed":
+            return urllib.request.Request(f"{self.base_url}/", headers=headers)
+        if kind == "post":
+            _, slug = self.rng.choice(self.posts)
+            return urllib.request.Request(f"{self.base_url}/post/{slug}/", headers=headers)
+        if kind == "profile":
+            username = self.rng.choice(self.usernames)
+            return urllib.request.Request(f"{self.base_url}/profile/{username}/", headers=headers)
+
+        pk, _ = self.rng.choice(self.posts)
+        headers.update({"Accept": "application/json", "Referer": self.base_url + "/"})
+        return urllib.request.Request(f"{self.base_url}/post/{pk}/like/", data=b"", headers=headers)
+
+    def hit(self, kind):
+        request = self.build_request(kind)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                ok = response.status < 400
+        except (urllib.error.URLError, TimeoutError):
+            ok = False
+        return kind, time.perf_counter() - started, ok
+
+    # =========================
+    # Relatório
+    # =========================
+    def report(self, timings, errors, wall):
+        self.stdout.write(
+            f"{'endpoint':<10}{'reqs':>8}{'erros':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+        )
+        for kind in TRAFFIC_MIX:
+            values = sorted(timings.get(kind, []))
+            self.stdout.write(
+                f"{kind:<10}{len(values):>8}{errors.get(kind, 0):>8}"
+                f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+                f"{percentile(values, 99) * 1000:>10.1f}{len(values) / wall:>10.1f}"
+            )
+        total = sum(len(values) for values in timings.values())
+        self.stdout.write(self.style.SUCCESS(f"{total} requisições em {wall:.1f}s ({total / wall:.1f} req/s)"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = "Recalcula os contadores de curtidas, comentários e respostas e corrige divergências."
+
+    def handle(self, *args, **options):
+        for counter, repaired in recount_counters().items():
+            self.stdout.write(f"{counter}: {repaired} linha(s) corrigida(s)")
+        self.stdout.write(self.style.SUCCESS("Contadores atualizados."))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de tarefas em segundo plano (e-mails, versões de imagens...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Processa o que estiver vencido e sai.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Segundos entre verificações da fila.")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            processed = run_pending()
+            self.stdout.write(f"{processed} tarefa(s) processada(s).")
+            return
+
+        self.stdout.write("Worker iniciado. Ctrl+C para sair.")
+        try:
+            while True:
+                if not run_pending():
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker encerrado.")
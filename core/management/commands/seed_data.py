@@ -0,0 +1,183 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.counters import recount_counters
+from core.models import AVATAR_DEFAULT, Comment, Like, Post, Profile, UserPost, UserPostComment, UserPostLike
+from core.pagecache import invalidate
+
+SEED_PASSWORD = "senha-de-teste"
+
+WORDS = (
+    "sensibilidade química múltipla sintomas perfume fragrância produtos limpeza casa "
+    "tratamento médico diagnóstico ambiente trabalho escola apoio família relato cuidado "
+    "alergia cheiro ar livre qualidade vida comunidade experiência dica ajuda saúde"
+).split()
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@contextmanager
+def _manual_timestamps(*models):
+    # Desliga auto_now/auto_now_add para o bulk_create respeitar as datas geradas.
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "Gera dados sintéticos (usuários, posts, comentários em árvore e curtidas) com bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--user-posts", type=int, default=2000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--likes", type=int, default=100000)
+        parser.add_argument("--days", type=int, default=365, help="Janela de datas dos dados gerados.")
+        parser.add_argument("--hot-share", type=float, default=0.5,
+                            help="Fração das curtidas que vai para 1%% dos posts (posts em alta).")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.window = timedelta(days=options["days"])
+        self.prefix = f"seed{self.rng.randrange(16 ** 6):06x}"
+
+        with _manual_timestamps(Post, UserPost, Comment, UserPostComment):
+            users = self.create_users(options["users"])
+            posts = self.create_posts(options["posts"])
+            user_posts = self.create_user_posts(options["user_posts"], users)
+
+            # Comentários e curtidas divididos entre posts oficiais e da comunidade.
+            self.create_comments(Comment, posts, users, options["comments"] // 2)
+            self.create_comments(UserPostComment, user_posts, users, options["comments"] - options["comments"] // 2)
+        self.create_likes(Like, posts, users, options["likes"] // 2, options["hot_share"])
+        self.create_likes(UserPostLike, user_posts, users, options["likes"] - options["likes"] // 2, options["hot_share"])
+
+        # bulk_create não dispara signals: contadores e cache são acertados no fim.
+        self.stdout.write("Recalculando contadores...")
+        recount_counters()
+        invalidate("feed", "profiles")
+        self.stdout.write(self.style.SUCCESS(f"Dados gerados (prefixo {self.prefix}, senha {SEED_PASSWORD!r})."))
+
+    # =========================
+    # Geradores
+    # =========================
+    def random_date(self):
+        return self.now - self.window * self.rng.random() ** 2  # mais conteúdo recente
+
+    def bulk(self, model, objects, total):
+        created = []
+        for batch in _batched(objects, self.batch_size):
+            created.extend(model.objects.bulk_create(batch))
+            self.stdout.write(f"{model.__name__}: {len(created)}/{total}", ending="\r")
+        self.stdout.write(f"{model.__name__}: {len(created)}/{total}")
+        return created
+
+    def create_users(self, total):
+        password = make_password(SEED_PASSWORD)
+        users = self.bulk(User, (
+            User(username=f"{self.prefix}_{i}", email=f"{self.prefix}_{i}@example.com", password=password)
+            for i in range(total)
+        ), total)
+        self.bulk(Profile, (
+            Profile(user=user, avatar=AVATAR_DEFAULT, bio=_text(self.rng, 12)) for user in users
+        ), total)
+        return [user.pk for user in users]
+
+    def create_posts(self, total):
+        def build():
+            for i in range(total):
+                created_at = self.random_date()
+                yield Post(
+                    title=_text(self.rng, 6), slug=f"{self.prefix}-{i}", summary=_text(self.rng, 20),
+                    content=_text(self.rng, 300), created_at=created_at, updated_at=created_at,
+                    published=self.rng.random() > 0.05,
+                )
+        return [post.pk for post in self.bulk(Post, build(), total)]
+
+    def create_user_posts(self, total, users):
+        def build():
+            for _ in range(total):
+                created_at = self.random_date()
+                yield UserPost(
+                    user_id=self.rng.choice(users), title=_text(self.rng, 5), content=_text(self.rng, 80),
+                    created_at=created_at, updated_at=created_at, is_approved=self.rng.random() > 0.2,
+                )
+        return [post.pk for post in self.bulk(UserPost, build(), total)]
+
+    def create_comments(self, model, posts, users, total):
+        # Árvores: cada lote é criado em níveis, e as respostas apontam para
+        # comentários do nível anterior no mesmo post (ids vêm do bulk_create).
+        created = 0
+        while created < total:
+            size = min(self.batch_size, total - created)
+            level = [
+                model(post_id=self.rng.choice(posts), user_id=self.rng.choice(users),
+                      content=_text(self.rng, 25), created_at=self.random_date())
+                for _ in range(max(1, size // 2))
+            ]
+            remaining = size - len(level)
+            while level:
+                level = model.objects.bulk_create(level)
+                created += len(level)
+                replies = []
+                for parent in level:
+                    for _ in range(min(remaining, self.rng.choice((0, 0, 1, 2)))):
+                        replies.append(model(
+                            post_id=parent.post_id, parent_id=parent.pk, user_id=self.rng.choice(users),
+                            content=_text(self.rng, 15),
+                            created_at=min(self.now, parent.created_at + timedelta(minutes=self.rng.randint(1, 600))),
+                        ))
+                        remaining -= 1
+                level = replies
+            self.stdout.write(f"{model.__name__}: {created}/{total}", ending="\r")
+        self.stdout.write(f"{model.__name__}: {created}/{total}")
+
+    def create_likes(self, model, posts, users, total, hot_share):
+        # Distribuição com cauda: hot_share das curtidas cai em 1% dos posts.
+        # Pares repetidos (post, usuário) são descartados pelo unique_together,
+        # então o total final pode ficar um pouco abaixo do pedido.
+        hot = self.rng.sample(posts, max(1, len(posts) // 100))
+        target = min(total, len(posts) * len(users))
+
+        attempted = 0
+        while attempted < target:
+            size = min(self.batch_size, target - attempted)
+            batch = {
+                (self.rng.choice(hot if self.rng.random() < hot_share else posts), self.rng.choice(users))
+                for _ in range(size)
+            }
+            model.objects.bulk_create(
+                [model(post_id=post, user_id=user) for post, user in batch], ignore_conflicts=True
+            )
+            attempted += size
+            self.stdout.write(f"{model.__name__}: {attempted}/{target}", ending="\r")
+        self.stdout.write(f"{model.__name__}: {model.objects.count()} criadas")
@@ -0,0 +1,166 @@
+import os
+import secrets
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .models import UserPost
+
+# Com vários workers do gunicorn, PROMETHEUS_MULTIPROC_DIR aponta para um
+# diretório compartilhado (ver gunicorn.conf.py) e cada processo grava os
+# próprios arquivos; o /metrics soma todos na hora da coleta.
+
+# =========================
+# Métricas
+# =========================
+REQUEST_LATENCY = Histogram(
+    "sqm_request_latency_seconds",
+    "Tempo de resposta por view.",
+    ["view", "method"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "sqm_request_db_queries",
+    "Consultas SQL por requisição.",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+WRITES = Counter(
+    "sqm_writes_total",
+    "Curtidas e comentários gravados.",
+    ["kind"],
+)
+PAGE_CACHE = Counter(
+    "sqm_page_cache_requests_total",
+    "Consultas ao cache de páginas de anônimos.",
+    ["view", "result"],
+)
+RATE_LIMITED = Counter(
+    "sqm_rate_limited_total",
+    "Requisições recusadas pelo limite de tentativas.",
+    ["action"],
+)
+UPLOAD_SIZE = Histogram(
+    "sqm_upload_size_bytes",
+    "Tamanho das imagens enviadas.",
+    ["source"],
+    buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 25e6),
+)
+
+
+def record_write(kind):
+    WRITES.labels(kind=kind).inc()
+
+
+def record_page_cache(view_name, outcome):
+    PAGE_CACHE.labels(view=view_name, result=outcome).inc()
+
+
+def record_rate_limited(action):
+    RATE_LIMITED.labels(action=action).inc()
+
+
+def record_upload(source, size):
+    UPLOAD_SIZE.labels(source=source).observe(size)
+
+
+# =========================
+# Métricas calculadas na coleta
+# =========================
+class ApprovalQueueCollector:
+    # Valor do banco, lido por quem atende o /metrics: não depende do processo.
+    def _gauge(self):
+        return GaugeMetricFamily("sqm_approval_queue_depth", "Postagens da comunidade aguardando aprovação.")
+
+    def describe(self):
+        # Sem isso o register() chamaria collect() (e o banco) no import.
+        return [self._gauge()]
+
+    def collect(self):
+        gauge = self._gauge()
+        gauge.add_metric([], UserPost.objects.filter(is_approved=False, moderated_at__isnull=True).count())
+        yield gauge
+
+
+REGISTRY.register(ApprovalQueueCollector())
+
+
+def metrics_registry():
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    # Um registry novo por coleta, somando os arquivos de todos os workers.
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(ApprovalQueueCollector())
+    return registry
+
+
+# =========================
+# Middleware (latência e consultas por view)
+# =========================
+def _count_query(counter):
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _count_queries(self, stack, queries):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(_count_query(queries)))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = [0]
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self._count_queries(stack, queries)
+            response = self.get_response(request)
+        self.observe(request, time.perf_counter() - started, queries[0])
+        return response
+
+    async def __acall__(self, request):
+        # Conexões são por thread: o ORM das views async roda na thread do
+        # sync_to_async da requisição, então o contador é instalado lá.
+        queries = [0]
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self._count_queries)(stack, queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.observe(request, time.perf_counter() - started, queries[0])
+        return response
+
+    def observe(self, request, elapsed, queries):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "sem_rota"
+        if view != "metrics":
+            REQUEST_LATENCY.labels(view=view, method=request.method).observe(elapsed)
+            REQUEST_QUERIES.labels(view=view).observe(queries)
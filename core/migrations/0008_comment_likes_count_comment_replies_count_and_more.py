@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    counters = (
+        ("Like", "post", "Post", "likes_count"),
+        ("Comment", "post", "Post", "comments_count"),
+        ("UserPostLike", "post", "UserPost", "likes_count"),
+        ("UserPostComment", "post", "UserPost", "comments_count"),
+        ("CommentLike", "comment", "Comment", "likes_count"),
+        ("Comment", "parent", "Comment", "replies_count"),
+    )
+    for source_name, fk, target_name, field in counters:
+        source = apps.get_model("core", source_name)
+        target = apps.get_model("core", target_name)
+        counts = (
+            source.objects.filter(**{fk: OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(n=Count("pk"))
+            .values("n")
+        )
+        target.objects.update(**{field: Coalesce(Subquery(counts), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_userpostcomment_userpostlike'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Curtidas'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Respostas'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comentários'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Curtidas'),
+        ),
+        migrations.AddField(
+            model_name='userpost',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comentários'),
+        ),
+        migrations.AddField(
+            model_name='userpost',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Curtidas'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
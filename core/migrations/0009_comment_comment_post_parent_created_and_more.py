@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_comment_likes_count_comment_replies_count_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'parent', 'created_at'], name='comment_post_parent_created'),
+        ),
+        migrations.AddIndex(
+            model_name='userpostcomment',
+            index=models.Index(fields=['post', 'parent', 'created_at'], name='upcomment_post_parent_created'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations
+
+# Colunas indexadas por tabela, com o peso usado no PostgreSQL (A > B > C).
+SEARCH_COLUMNS = {
+    "core_post": {"title": "A", "summary": "B", "content": "C"},
+    "core_userpost": {"title": "A", "content": "C"},
+    "core_comment": {"content": "C"},
+}
+
+
+# =========================
+# PostgreSQL: tsvector gerado + GIN
+# =========================
+def _postgres_forward(schema_editor):
+    for table, columns in SEARCH_COLUMNS.items():
+        vector = " || ".join(
+            f"setweight(to_tsvector('portuguese'::regconfig, coalesce({column}, '')), '{weight}')"
+            for column, weight in columns.items()
+        )
+        # Coluna gerada: o banco recalcula a cada INSERT/UPDATE, sem depender de signals.
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED"
+        )
+        schema_editor.execute(f"CREATE INDEX {table}_search_idx ON {table} USING gin (search_vector)")
+
+
+def _postgres_backward(schema_editor):
+    for table in SEARCH_COLUMNS:
+        schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN search_vector")
+
+
+# =========================
+# SQLite: FTS5 com conteúdo externo, mantido por triggers
+# =========================
+def _sqlite_forward(schema_editor):
+    for table, columns in SEARCH_COLUMNS.items():
+        names = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5({names}, content='{table}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts(rowid, {names}) VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {table}_fts_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {table}_fts(rowid, {names}) VALUES (new.id, {new_values}); END"
+        )
+        schema_editor.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def _sqlite_backward(schema_editor):
+    for table in SEARCH_COLUMNS:
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _postgres_forward(schema_editor)
+    elif vendor == "sqlite":
+        _sqlite_forward(schema_editor)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _postgres_backward(schema_editor)
+    elif vendor == "sqlite":
+        _sqlite_backward(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_post_cover_renditions_userpost_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
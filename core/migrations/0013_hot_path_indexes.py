@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('published', True)), fields=['-created_at', '-id'], name='post_published_created'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('published', True)), fields=['updated_at'], name='post_published_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='userpost',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['-created_at', '-id'], name='userpost_approved_created'),
+        ),
+        migrations.AddIndex(
+            model_name='userpost',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['updated_at'], name='userpost_approved_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='userpost',
+            index=models.Index(fields=['user', '-created_at'], name='userpost_user_created'),
+        ),
+    ]
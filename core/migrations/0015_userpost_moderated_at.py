@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpost',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Moderada em'),
+        ),
+        migrations.AddIndex(
+            model_name='userpost',
+            index=models.Index(condition=models.Q(('is_approved', False), ('moderated_at__isnull', True)), fields=['created_at', 'id'], name='userpost_pending_created'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_built_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
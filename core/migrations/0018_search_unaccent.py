@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# Mesmas colunas e pesos da 0012_search_indexes
+SEARCH_COLUMNS = {
+    "core_post": {"title": "A", "summary": "B", "content": "C"},
+    "core_userpost": {"title": "A", "content": "C"},
+    "core_comment": {"content": "C"},
+}
+
+
+# =========================
+# PostgreSQL: configuração portuguese + unaccent
+# =========================
+# A 'portuguese' pura mantém acentos: "quimica" não achava "química", ao
+# contrário do FTS5 do SQLite (remove_diacritics). A cópia tira os acentos
+# antes do stemmer; busca (core/search.py) e índice usam a mesma.
+def _postgres_vector(config, columns):
+    return " || ".join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in columns.items()
+    )
+
+
+def _postgres_rebuild(schema_editor, config):
+    for table, columns in SEARCH_COLUMNS.items():
+        schema_editor.execute(f"ALTER TABLE {table} DROP COLUMN search_vector")
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS ({_postgres_vector(config, columns)}) STORED"
+        )
+        schema_editor.execute(f"CREATE INDEX {table}_search_idx ON {table} USING gin (search_vector)")
+
+
+def _postgres_forward(schema_editor):
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    schema_editor.execute("CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese)")
+    schema_editor.execute(
+        "ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent "
+        "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem"
+    )
+    _postgres_rebuild(schema_editor, "portuguese_unaccent")
+
+
+def _postgres_backward(schema_editor):
+    _postgres_rebuild(schema_editor, "portuguese")
+    schema_editor.execute("DROP TEXT SEARCH CONFIGURATION portuguese_unaccent")
+
+
+# =========================
+# SQLite: trigger de UPDATE só nas colunas indexadas
+# =========================
+# Sem a lista de colunas, cada UPDATE de contador (likes_count etc.)
+# reescrevia a linha do FTS.
+def _sqlite_update_trigger(schema_editor, table, columns, only_indexed):
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    of_columns = f"OF {names} " if only_indexed else ""
+    schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_au")
+    schema_editor.execute(
+        f"CREATE TRIGGER {table}_fts_au AFTER UPDATE {of_columns}ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {table}_fts(rowid, {names}) VALUES (new.id, {new_values}); END"
+    )
+
+
+def forward(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _postgres_forward(schema_editor)
+    elif vendor == "sqlite":
+        for table, columns in SEARCH_COLUMNS.items():
+            _sqlite_update_trigger(schema_editor, table, columns, only_indexed=True)
+
+
+def backward(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _postgres_backward(schema_editor)
+    elif vendor == "sqlite":
+        for table, columns in SEARCH_COLUMNS.items():
+            _sqlite_update_trigger(schema_editor, table, columns, only_indexed=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_profile_timeline_built_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
@@ -12,6 +12,8 @@ class Profile(models.Model):
     avatar = models.CharField(max_length=120, default=AVATAR_DEFAULT)
     bio = models.TextField(max_length=300, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Preenchido quando a timeline foi montada; só então o fan-out escreve nela.
+    timeline_built_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.user.username
@@ -26,11 +28,24 @@ class Post(models.Model):
     summary = models.TextField(blank=True)
     content = models.TextField()
     cover = models.ImageField(upload_to="posts/", blank=True, null=True)
+    cover_renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     published = models.BooleanField(default=True)
 
+    # Contadores desnormalizados (ver core/counters.py)
+    likes_count = models.PositiveIntegerField("Curtidas", default=0, editable=False)
+    comments_count = models.PositiveIntegerField("Comentários", default=0, editable=False)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Feed (keyset por created_at, id) e Last-Modified do feed
+            models.Index(
+                fields=["-created_at", "-id"], condition=models.Q(published=True), name="post_published_created"
+            ),
+            models.Index(fields=["updated_at"], condition=models.Q(published=True), name="post_published_updated"),
+        ]
 
     def __str__(self):
         return self.title
@@ -44,12 +59,33 @@ class UserPost(models.Model):
     title = models.CharField(max_length=150)
     content = models.TextField()
     image = models.ImageField(upload_to="user_posts/", blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     embed_url = models.URLField("Link de vídeo (YouTube, Instagram, Facebook)", blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_approved = models.BooleanField(default=False)
+    moderated_at = models.DateTimeField("Moderada em", null=True, blank=True, editable=False)
+
+    likes_count = models.PositiveIntegerField("Curtidas", default=0, editable=False)
+    comments_count = models.PositiveIntegerField("Comentários", default=0, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Feed (keyset por created_at, id) e Last-Modified do feed
+            models.Index(
+                fields=["-created_at", "-id"], condition=models.Q(is_approved=True), name="userpost_approved_created"
+            ),
+            models.Index(fields=["updated_at"], condition=models.Q(is_approved=True), name="userpost_approved_updated"),
+            # Perfil e checagem de uma postagem por dia
+            models.Index(fields=["user", "-created_at"], name="userpost_user_created"),
+            # Fila de moderação (core/moderation.py)
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_approved=False, moderated_at__isnull=True),
+                name="userpost_pending_created",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -95,6 +131,14 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies")
 
+    likes_count = models.PositiveIntegerField("Curtidas", default=0, editable=False)
+    replies_count = models.PositiveIntegerField("Respostas", default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "parent", "created_at"], name="comment_post_parent_created"),
+        ]
+
     def __str__(self):
         return f"Comentário de {self.user.username} em {self.post.title}"
 
@@ -145,5 +189,73 @@ class UserPostComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     parent = models.ForeignKey("self", null=True, blank=True, on_delete=models.CASCADE, related_name="replies")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "parent", "created_at"], name="upcomment_post_parent_created"),
+        ]
+
     def __str__(self):
         return f"Comentário de {self.user.username} em {self.post.title}"
+
+
+# ========================
+# Fila de tarefas em segundo plano (ver core/tasks.py)
+# ========================
+class Task(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pendente"),
+        (RUNNING, "Executando"),
+        (FAILED, "Falhou"),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # O worker só procura tarefas pendentes já vencidas, na ordem de execução.
+            models.Index(fields=["run_at", "id"], condition=models.Q(status="pending"), name="task_pending_run_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+# ========================
+# Timelines (feed pré-calculado por usuário)
+# ========================
+class TimelineEntry(models.Model):
+    # Mesmos tipos do feed (core/feed.py); object_id aponta para Post ou UserPost.
+    KIND_CHOICES = [
+        ("oficial", "Post oficial"),
+        ("usuario", "Postagem da comunidade"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField()  # cópia da data do item, para ordenar sem JOIN
+
+    class Meta:
+        constraints = [
+            # Também serve a remoção de um item de todas as timelines.
+            models.UniqueConstraint(fields=["kind", "object_id", "user"], name="timeline_unique_item"),
+        ]
+        indexes = [
+            # Leitura: uma faixa do índice por usuário, na ordem do cursor do feed.
+            models.Index(fields=["user", "-created_at", "-kind", "-object_id"], name="timeline_user_created"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.kind} {self.object_id}"
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.functions import Now
+
+from .cursors import keyset_page
+from .models import UserPost
+from .pagecache import invalidate
+from .timelines import schedule_timeline_update
+
+MODERATION_PAGE_SIZE = 50
+MODERATION_CHUNK_SIZE = 500
+
+
+# =========================
+# Fila de moderação (postagens da comunidade)
+# =========================
+def pending_user_posts():
+    # Pendente = nunca moderada; reprovadas saem da fila sem ser apagadas.
+    return UserPost.objects.filter(is_approved=False, moderated_at__isnull=True)
+
+
+def moderation_page(cursor=None, size=MODERATION_PAGE_SIZE):
+    # Mais antigas primeiro, por keyset (created_at, id) sobre o índice parcial
+    # das pendentes; autor e perfil vêm no mesmo SELECT.
+    qs = pending_user_posts().select_related("user__profile")
+    return keyset_page(qs, cursor, size, newest_first=False)
+
+
+def moderate(ids, approve, chunk_size=MODERATION_CHUNK_SIZE):
+    # Lotes curtos: cada um é uma transação própria, sem travar a tabela
+    # inteira numa fila grande. Retorna quantas postagens mudaram.
+    ids = sorted(set(ids))
+    changed = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        with transaction.atomic():
+            rows = UserPost.objects.filter(pk__in=chunk).exclude(is_approved=approve, moderated_at__isnull=False)
+            targets = dict(rows.values_list("pk", "user__username"))
+            updated = UserPost.objects.filter(pk__in=targets).update(
+                is_approved=approve, moderated_at=Now(), updated_at=Now()
+            )
+            if updated:
+                # update() não dispara signals: invalida feed e perfis afetados de uma vez.
+                invalidate("feed", *(f"profile:{username}" for username in set(targets.values())))
+                schedule_timeline_update("usuario", list(targets), approve)
+        changed += updated
+    return changed
@@ -0,0 +1,240 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from .metrics import record_page_cache
+from .models import Comment, CommentLike, Like, Post, Profile, UserPost, UserPostComment, UserPostLike
+
+# Views que passaram pelo decorator (para o relatório de hit/miss).
+CACHED_VIEWS = set()
+
+
+# =========================
+# Gerações por escopo ("feed", "post:<slug>", "profile:<username>", ...)
+# =========================
+# A geração é o instante (em ns) da última invalidação do escopo: serve de
+# versão para as chaves do cache e de base para o Last-Modified/ETag.
+def _generation_key(scope):
+    return f"pagecache:gen:{scope}"
+
+
+def _generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    # Chave despejada: recomeça em "agora", que nunca coincide com uma
+    # geração antiga, então páginas velhas não voltam a ser servidas.
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def _bump(scopes):
+    now = time.time_ns()
+    cache.set_many({_generation_key(scope): now for scope in scopes}, None)
+
+
+def invalidate(*scopes):
+    # Só depois do commit: senão outra requisição pode recolocar no cache
+    # a versão antiga antes de a escrita ficar visível.
+    scopes = [scope for scope in scopes if scope]
+    if scopes:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+# Escopos afetados por uma escrita; lê só relações já carregadas quando
+# a view passa o alvo com select_related.
+def page_scopes(instance):
+    if isinstance(instance, Post):
+        return ["feed", f"post:{instance.slug}"]
+    if isinstance(instance, UserPost):
+        return ["feed", f"profile:{instance.user.username}"]
+    if isinstance(instance, (Comment, Like)):
+        return ["feed", f"post:{instance.post.slug}"]
+    if isinstance(instance, CommentLike):
+        return [f"post:{instance.comment.post.slug}"]
+    if isinstance(instance, (UserPostComment, UserPostLike)):
+        return ["feed", f"profile:{instance.post.user.username}"]
+    if isinstance(instance, Profile):
+        return ["feed", "profiles", f"profile:{instance.user.username}"]
+    return []
+
+
+# =========================
+# Métricas de hit/miss
+# =========================
+def _stat_key(view_name, outcome):
+    return f"pagecache:stats:{view_name}:{outcome}"
+
+
+def _record(view_name, outcome):
+    record_page_cache(view_name, outcome)
+    key = _stat_key(view_name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_stats():
+    stats = {}
+    for view_name in sorted(CACHED_VIEWS):
+        counts = cache.get_many([_stat_key(view_name, "hit"), _stat_key(view_name, "miss")])
+        hits = counts.get(_stat_key(view_name, "hit"), 0)
+        misses = counts.get(_stat_key(view_name, "miss"), 0)
+        total = hits + misses
+        stats[view_name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+# =========================
+# Cache de páginas para visitantes anônimos
+# =========================
+def has_pending_messages(request):
+    # len() carrega as mensagens sem marcá-las como lidas.
+    return len(get_messages(request)) > 0
+
+
+def _cacheable_request(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+        and not has_pending_messages(request)
+    )
+
+
+def _page_key(view_name, request, generations):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    version = ".".join(str(generation) for generation in generations)
+    return f"pagecache:page:{view_name}:{path}:{version}"
+
+
+def _lookup(view_name, scopes, request, kwargs):
+    # (chave, resposta em cache); chave None quando a requisição não usa o cache.
+    if not _cacheable_request(request):
+        return None, None
+
+    key = _page_key(view_name, request, _generations(scopes(**kwargs)))
+    cached = cache.get(key)
+    if cached is not None:
+        _record(view_name, "hit")
+        content, content_type = cached
+        return key, HttpResponse(content, content_type=content_type)
+
+    _record(view_name, "miss")
+    return key, None
+
+
+def _store(key, response):
+    if response.status_code == 200 and not response.streaming and not response.cookies:
+        cache.set(key, (response.content, response["Content-Type"]), settings.PAGE_CACHE_TIMEOUT)
+
+
+def cache_anonymous(view_name, scopes):
+    # scopes recebe os kwargs da view e devolve os escopos que a página usa.
+    CACHED_VIEWS.add(view_name)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            # Usuário e mensagens vêm da sessão (banco): fora do event loop.
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                key, cached = await sync_to_async(_lookup)(view_name, scopes, request, kwargs)
+                if cached is not None:
+                    return cached
+                response = await view(request, *args, **kwargs)
+                if key:
+                    await sync_to_async(_store)(key, response)
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, cached = _lookup(view_name, scopes, request, kwargs)
+            if cached is not None:
+                return cached
+            response = view(request, *args, **kwargs)
+            if key:
+                _store(key, response)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# =========================
+# GET condicional (ETag/Last-Modified)
+# =========================
+def _freshness(request, scopes, last_modified, kwargs):
+    # Calculado uma vez por requisição; None desliga o GET condicional.
+    if not hasattr(request, "_page_freshness"):
+        freshness = None
+        if request.method in ("GET", "HEAD") and not has_pending_messages(request):
+            stamps = _generations(scopes(**kwargs))
+            latest = last_modified(**kwargs) if last_modified else None
+            if latest is not None:
+                stamps.append(int(latest.timestamp() * 1_000_000) * 1000)
+            freshness = max(stamps)
+        request._page_freshness = freshness
+    return request._page_freshness
+
+
+def cached_page(view_name, scopes, last_modified=None):
+    # Cache para anônimos + 304 para quem já tem a versão atual. O ETag
+    # inclui o usuário, porque a página muda conforme quem está logado.
+    def last_modified_func(request, *args, **kwargs):
+        freshness = _freshness(request, scopes, last_modified, kwargs)
+        if freshness is None:
+            return None
+        return datetime.fromtimestamp(freshness / 1e9, tz=timezone.utc)
+
+    def etag_func(request, *args, **kwargs):
+        freshness = _freshness(request, scopes, last_modified, kwargs)
+        if freshness is None:
+            return None
+        viewer = request.user.pk if request.user.is_authenticated else "anon"
+        raw = f"{view_name}:{request.get_full_path()}:{viewer}:{freshness}"
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def prepare(request, kwargs):
+        request.user.is_authenticated  # carrega o usuário da sessão
+        _freshness(request, scopes, last_modified, kwargs)
+
+    def decorator(view):
+        view = cache_anonymous(view_name, scopes)(view)
+        view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+        view = vary_on_cookie(view)
+        if not iscoroutinefunction(view):
+            return view
+
+        # O condition() chama etag_func/last_modified_func direto no event
+        # loop; os valores (cache, agregação, sessão) são calculados antes,
+        # numa thread, e ficam guardados na requisição.
+        conditional_view = view
+
+        @wraps(conditional_view)
+        async def async_view(request, *args, **kwargs):
+            await sync_to_async(prepare)(request, kwargs)
+            return await conditional_view(request, *args, **kwargs)
+
+        return async_view
+
+    return decorator
@@ -0,0 +1,176 @@
+import cProfile
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger("core.profiling")
+
+_MISSING = object()
+_current = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.slow_queries = []
+        self.render_time = 0.0
+        self.render_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+# =========================
+# Ganchos (instalados só com REQUEST_PROFILING ligado)
+# =========================
+def _timed_execute(execute, sql, params, many, context):
+    profile = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        profile.queries += 1
+        profile.db_time += elapsed
+        if elapsed * 1000 >= settings.REQUEST_PROFILING_SLOW_QUERY_MS:
+            profile.slow_queries.append({"ms": round(elapsed * 1000, 1), "sql": sql[:500]})
+
+
+def _wrap_template_render(original):
+    def render(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return original(self, *args, **kwargs)
+        # render_to_string dentro de outro render não conta duas vezes
+        profile.render_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            profile.render_depth -= 1
+            if not profile.render_depth:
+                profile.render_time += time.perf_counter() - started
+
+    return render
+
+
+def _wrap_cache_get(original):
+    def get(self, key, default=None, version=None):
+        profile = _current.get()
+        value = original(self, key, _MISSING, version)
+        if profile is not None:
+            if value is _MISSING:
+                profile.cache_misses += 1
+            else:
+                profile.cache_hits += 1
+        return default if value is _MISSING else value
+
+    return get
+
+
+def _wrap_cache_get_many(original):
+    def get_many(self, keys, version=None):
+        profile = _current.get()
+        found = original(self, keys, version)
+        if profile is not None:
+            keys = list(keys)
+            profile.cache_hits += len(found)
+            profile.cache_misses += len(keys) - len(found)
+        return found
+
+    return get_many
+
+
+def _install_hooks():
+    if getattr(Template.render, "_profiled", False):
+        return
+    Template.render = _wrap_template_render(Template.render)
+    Template.render._profiled = True
+
+    backend = type(caches["default"])
+    backend.get = _wrap_cache_get(backend.get)
+    backend.get_many = _wrap_cache_get_many(backend.get_many)
+
+
+# =========================
+# Middleware
+# =========================
+class RequestProfilingMiddleware:
+    # Opt-in (REQUEST_PROFILING=True). Desligado, o Django remove o
+    # middleware da cadeia na inicialização: custo zero por requisição.
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        _install_hooks()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = None
+        if random.random() < settings.REQUEST_PROFILING_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_timed_execute))
+                if profiler:
+                    stack.enter_context(profiler)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        response["Server-Timing"] = self.server_timing(profile, total)
+        self.log(request, response, profile, total)
+        if profiler and total * 1000 >= settings.REQUEST_PROFILING_SLOW_MS:
+            self.dump(request, profiler, total)
+        return response
+
+    def server_timing(self, profile, total):
+        return ", ".join([
+            f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"',
+            f"tpl;dur={profile.render_time * 1000:.1f}",
+            f'cache;desc="{profile.cache_hits} hit {profile.cache_misses} miss"',
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+    def log(self, request, response, profile, total):
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "db_ms": round(profile.db_time * 1000, 1),
+            "queries": profile.queries,
+            "template_ms": round(profile.render_time * 1000, 1),
+            "cache_hits": profile.cache_hits,
+            "cache_misses": profile.cache_misses,
+        }
+        if profile.slow_queries:
+            record["slow_queries"] = profile.slow_queries
+        slow = total * 1000 >= settings.REQUEST_PROFILING_SLOW_MS
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record, ensure_ascii=False))
+
+    def dump(self, request, profiler, total):
+        directory = Path(settings.REQUEST_PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        match = getattr(request, "resolver_match", None)
+        name = (match.view_name if match else "unknown").replace(":", "-")
+        path = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{total * 1000:.0f}ms.prof"
+        profiler.dump_stats(path)
+        logger.warning(json.dumps({"profile": str(path), "path": request.path}))
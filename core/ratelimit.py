@@ -0,0 +1,206 @@
+import logging
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+
+from .likes import wants_json
+from .metrics import record_rate_limited
+from .models import Comment, CommentLike, Like, UserPost, UserPostComment, UserPostLike
+
+logger = logging.getLogger("core.ratelimit")
+
+Rate = namedtuple("Rate", ["limit", "period"])
+
+PERIODS = {"s": 1, "m": 60, "h": 3600}
+
+RATE_LIMITED_MESSAGE = "Muitas tentativas em pouco tempo. Espere um pouco e tente de novo."
+QUOTA_MESSAGE = "Você já atingiu o limite de postagens de hoje."
+# Segundos que a reserva da cota pode durar (o save de uma postagem)
+QUOTA_LOCK_TIMEOUT = 30
+
+
+def parse_rate(value):
+    # "10/m" -> Rate(10, 60)
+    try:
+        limit, unit = value.split("/")
+        return Rate(int(limit), PERIODS[unit])
+    except (ValueError, KeyError):
+        raise ImproperlyConfigured(f"Limite inválido: {value!r} (use N/s, N/m ou N/h).")
+
+
+# =========================
+# Quem está fazendo a requisição
+# =========================
+def user_key(request):
+    return request.user.pk if request.user.is_authenticated else None
+
+
+def ip_key(request):
+    # Atrás de um proxy (Render), o último IP do X-Forwarded-For é o que o
+    # proxy viu; os anteriores vêm do cliente e podem ser forjados.
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if settings.RATE_LIMIT_TRUST_PROXY and forwarded:
+        return forwarded.split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR")
+
+
+# =========================
+# Contagem no banco (cache fora do ar)
+# =========================
+# Linhas que cada ação cria; signup não tem fonte por IP e passa direto.
+DB_SOURCES = {
+    "post": [UserPost.objects.all()],
+    "comment": [Comment.objects.filter(parent__isnull=True), UserPostComment.objects.all()],
+    "reply": [Comment.objects.filter(parent__isnull=False)],
+    "like": [Like.objects.all(), CommentLike.objects.all(), UserPostLike.objects.all()],
+}
+
+
+def _db_count(action, ident, since):
+    return sum(qs.filter(user_id=ident, created_at__gte=since).count() for qs in DB_SOURCES.get(action, []))
+
+
+# =========================
+# Janela deslizante (contadores no cache)
+# =========================
+# Dois contadores fixos por chave: o da janela atual e o da anterior, pesado
+# pela fração dela que ainda cai dentro do período. incr é atômico no Redis.
+def _key(action, ident, window):
+    return f"ratelimit:{action}:{ident}:{window}"
+
+
+def _incr(key, timeout):
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expirou entre o add e o incr
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def hit(action, ident):
+    # Conta a tentativa; retorna (permitida, segundos até liberar).
+    rate = parse_rate(settings.RATE_LIMITS[action])
+    window, elapsed = divmod(time.time(), rate.period)
+    try:
+        current = _incr(_key(action, ident, int(window)), rate.period * 2)
+        previous = cache.get(_key(action, ident, int(window) - 1), 0)
+    except Exception:
+        logger.warning("Cache indisponível; limite de %r contado no banco.", action, exc_info=True)
+        if action not in DB_SOURCES:
+            return True, 0
+        since = timezone.now() - timedelta(seconds=rate.period)
+        return _db_count(action, ident, since) < rate.limit, rate.period
+
+    estimate = previous * (1 - elapsed / rate.period) + current
+    return estimate <= rate.limit, int(rate.period - elapsed) + 1
+
+
+def _rejection(request, action, retry_after):
+    record_rate_limited(action)
+    if wants_json(request):
+        response = JsonResponse({"error": RATE_LIMITED_MESSAGE}, status=429)
+        response["Retry-After"] = str(retry_after)
+        return response
+
+    messages.error(request, RATE_LIMITED_MESSAGE)
+    referer = request.META.get("HTTP_REFERER")
+    if url_has_allowed_host_and_scheme(referer, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return redirect(referer)
+    return redirect("feed")
+
+
+def _check(request, action, key):
+    if not settings.RATE_LIMITS_ENABLED:
+        return None
+    ident = key(request)
+    if ident is None:
+        return None
+    allowed, retry_after = hit(action, ident)
+    return None if allowed else _rejection(request, action, retry_after)
+
+
+def ratelimit(action, key=user_key, methods=("POST",)):
+    # Recusa antes de a view rodar, ou seja, antes de qualquer escrita.
+    # Coloque abaixo do @login_required para contar por usuário.
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method in methods:
+                    rejected = await sync_to_async(_check)(request, action, key)
+                    if rejected:
+                        return rejected
+                return await view(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                rejected = _check(request, action, key)
+                if rejected:
+                    return rejected
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# =========================
+# Cota diária de postagens (dia no fuso do site)
+# =========================
+def _today_start():
+    return timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+
+
+def _posts_today(user):
+    # Pelo índice userpost_user_created; o banco é a fonte da verdade: com
+    # LocMem cada worker teria o próprio contador.
+    return _db_count("post", user.pk, _today_start())
+
+
+def quota_left(user):
+    return max(0, settings.DAILY_POST_QUOTA - _posts_today(user))
+
+
+def _quota_lock_key(user):
+    return f"ratelimit:quota:lock:{user.pk}"
+
+
+def take_quota(user):
+    # Reserva até o release_quota: o cache só serializa envios simultâneos do
+    # mesmo usuário (enquanto um grava, o outro é recusado); a contagem é a
+    # do banco. O timeout libera a trava se o processo morrer no meio.
+    try:
+        locked = cache.add(_quota_lock_key(user), 1, QUOTA_LOCK_TIMEOUT)
+    except Exception:
+        logger.warning("Cache indisponível; cota diária sem trava.", exc_info=True)
+        locked = True
+    if not locked:
+        return False
+    if _posts_today(user) >= settings.DAILY_POST_QUOTA:
+        release_quota(user)
+        return False
+    return True
+
+
+def release_quota(user):
+    # Depois de gravar (ou de falhar): a próxima reserva já conta a postagem.
+    try:
+        cache.delete(_quota_lock_key(user))
+    except Exception:
+        pass  # a trava expira sozinha
@@ -0,0 +1,134 @@
+import heapq
+import re
+from collections import namedtuple
+from itertools import islice
+
+from django.db import connection
+from django.db.models import BooleanField, Expression, F, FloatField
+
+from .models import Comment, Post, UserPost
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE = 10
+SEARCH_MAX_LENGTH = 200
+
+SearchPage = namedtuple("SearchPage", ["items", "page", "has_next"])
+
+# Configuração de texto do PostgreSQL: portuguese sem acentos (migração 0018),
+# a mesma da coluna search_vector.
+SEARCH_CONFIG = "portuguese_unaccent"
+
+# Pesos do bm25 no SQLite, na ordem das colunas do FTS (ver migração 0012).
+FTS_WEIGHTS = {
+    "core_post": (10.0, 4.0, 1.0),
+    "core_userpost": (10.0, 1.0),
+    "core_comment": (1.0,),
+}
+
+
+# =========================
+# Índice de texto por banco
+# =========================
+# PostgreSQL: coluna gerada search_vector (tsvector, portuguese_unaccent) com GIN.
+# SQLite: tabela FTS5 <tabela>_fts mantida por triggers; sem stemmer em
+# português, cada termo vira busca por prefixo.
+def _fts_query(query):
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+class TableSQL(Expression):
+    # SQL cru que referencia a própria tabela como {table}. O alias vem da
+    # coluna pk resolvida, então continua certo dentro de subconsultas (U0):
+    # com o nome da tabela fixo, a subconsulta apontaria para a de fora.
+    def __init__(self, sql, params, output_field):
+        super().__init__(output_field=output_field)
+        self.sql = sql
+        self.params = params
+        self.pk = F("pk")
+
+    def get_source_expressions(self):
+        return [self.pk]
+
+    def set_source_expressions(self, exprs):
+        (self.pk,) = exprs
+
+    def as_sql(self, compiler, connection):
+        table = compiler.quote_name_unless_alias(self.pk.alias)
+        return self.sql.format(table=table), list(self.params)
+
+
+def _match(model, query):
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}'::regconfig, %s)"
+        match = TableSQL(f"{{table}}.search_vector @@ {tsquery}", [query], BooleanField())
+        rank = TableSQL(f"ts_rank({{table}}.search_vector, {tsquery})", [query], FloatField())
+        return match, rank
+
+    fts = f"{table}_fts"
+    expression = _fts_query(query)
+    weights = ", ".join(str(weight) for weight in FTS_WEIGHTS[table])
+    match = TableSQL(f"{{table}}.id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)", [expression], BooleanField())
+    # bm25 é "menor é melhor"; negado para ordenar igual ao ts_rank.
+    rank = TableSQL(
+        f"(SELECT -bm25({fts}, {weights}) FROM {fts} WHERE {fts} MATCH %s AND rowid = {{table}}.id)",
+        [expression],
+        FloatField(),
+    )
+    return match, rank
+
+
+def _searchable(query):
+    query = (query or "").strip()[:SEARCH_MAX_LENGTH]
+    if connection.vendor != "postgresql" and not _fts_query(query):
+        return ""
+    return query
+
+
+def search_match(model, query):
+    # Condição booleana da busca (None quando não sobra termo); combina com Q.
+    query = _searchable(query)
+    return _match(model, query)[0] if query else None
+
+
+def search_queryset(qs, query):
+    # Filtra e anota "rank" usando o índice; usado pela busca do site.
+    query = _searchable(query)
+    if not query:
+        return qs.none()
+    match, rank = _match(qs.model, query)
+    return qs.filter(match).annotate(rank=rank)
+
+
+# =========================
+# Fontes da busca do site
+# =========================
+# Só o que já é público: posts publicados, postagens aprovadas e comentários
+# de posts publicados.
+SEARCH_SOURCES = (
+    ("oficial", lambda: Post.objects.filter(published=True)),
+    ("usuario", lambda: UserPost.objects.filter(is_approved=True).select_related("user")),
+    ("comentario", lambda: Comment.objects.filter(post__published=True).select_related("post", "user")),
+)
+
+
+def _item_key(item):
+    return item["rank"], item["type"], item["obj"].pk
+
+
+def search(query, page=1, size=SEARCH_PAGE_SIZE):
+    page = max(1, min(page, SEARCH_MAX_PAGE))
+    offset = (page - 1) * size
+
+    # Cada fonte devolve no máximo offset + size + 1 linhas já ordenadas por
+    # relevância; o merge escolhe a fatia da página.
+    streams = []
+    for kind, source in SEARCH_SOURCES:
+        qs = search_queryset(source(), query).order_by("-rank", "-id")[: offset + size + 1]
+        streams.append([{"type": kind, "obj": obj, "rank": obj.rank} for obj in qs])
+
+    merged = heapq.merge(*streams, key=_item_key, reverse=True)
+    items = list(islice(merged, offset, offset + size + 1))
+    has_next = len(items) > size and page < SEARCH_MAX_PAGE
+    return SearchPage(items[:size], page, has_next)
@@ -1,11 +1,128 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 
-from .models import Profile, AVATAR_DEFAULT
+from .counters import COUNTED_MODELS, adjust_counters
+from .images import schedule_renditions
+from .metrics import record_write
+from .models import (
+    Post, Comment, Like, Profile, UserPost, AVATAR_DEFAULT, CommentLike,
+    UserPostLike, UserPostComment
+)
+from .pagecache import invalidate, page_scopes
+from .timelines import request_timeline_build, schedule_timeline_update
 
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.get_or_create(user=instance, defaults={"avatar": AVATAR_DEFAULT})
+
+
+# =========================
+# Contadores de curtidas/comentários
+# =========================
+def increment_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_counters(instance, 1)
+
+
+def decrement_counters(sender, instance, **kwargs):
+    adjust_counters(instance, -1)
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(increment_counters, sender=model, dispatch_uid=f"counters_save_{model.__name__}")
+    post_delete.connect(decrement_counters, sender=model, dispatch_uid=f"counters_delete_{model.__name__}")
+
+
+# =========================
+# Métricas de escrita (curtidas e comentários)
+# =========================
+WRITE_KINDS = {
+    Like: "like",
+    CommentLike: "comment_like",
+    UserPostLike: "user_post_like",
+    Comment: "comment",
+    UserPostComment: "user_post_comment",
+}
+
+
+def count_write(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_write(WRITE_KINDS[sender])
+
+
+for model in WRITE_KINDS:
+    post_save.connect(count_write, sender=model, dispatch_uid=f"metrics_write_{model.__name__}")
+
+
+# =========================
+# Invalidação do cache de páginas
+# =========================
+def invalidate_pages(sender, instance, **kwargs):
+    try:
+        scopes = page_scopes(instance)
+    except ObjectDoesNotExist:
+        # Exclusão em cascata: o alvo já saiu do banco e será invalidado por conta própria.
+        return
+    invalidate(*scopes)
+
+
+for model in (Post, UserPost, Comment, Like, CommentLike, UserPostComment, UserPostLike, Profile):
+    post_save.connect(invalidate_pages, sender=model, dispatch_uid=f"pagecache_save_{model.__name__}")
+    post_delete.connect(invalidate_pages, sender=model, dispatch_uid=f"pagecache_delete_{model.__name__}")
+
+
+# =========================
+# Versões redimensionadas das imagens
+# =========================
+@receiver(post_save, sender=Post)
+def post_cover_renditions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_renditions(instance, "cover")
+
+
+@receiver(post_save, sender=UserPost)
+def user_post_image_renditions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_renditions(instance, "image")
+
+
+# =========================
+# Timelines (fan-out dos itens do feed)
+# =========================
+@receiver(post_save, sender=User)
+def new_user_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.TIMELINES_ENABLED:
+        request_timeline_build(instance.pk)
+
+
+def _visibility_saved(update_fields, field):
+    # save(update_fields=[...]) sem o campo de visibilidade (versões das
+    # imagens, contadores) não muda o que está nas timelines.
+    return update_fields is None or field in update_fields
+
+
+@receiver(post_save, sender=Post)
+def post_timeline(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _visibility_saved(update_fields, "published"):
+        schedule_timeline_update("oficial", instance.pk, instance.published)
+
+
+@receiver(post_save, sender=UserPost)
+def user_post_timeline(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and _visibility_saved(update_fields, "is_approved"):
+        schedule_timeline_update("usuario", instance.pk, instance.is_approved)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_timeline(sender, instance, **kwargs):
+    schedule_timeline_update("oficial", instance.pk, False)
+
+
+@receiver(post_delete, sender=UserPost)
+def user_post_deleted_timeline(sender, instance, **kwargs):
+    schedule_timeline_update("usuario", instance.pk, False)
@@ -0,0 +1,132 @@
+import logging
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger("core.tasks")
+
+TASK_BACKOFF_CAP = 3600
+
+
+# =========================
+# @task
+# =========================
+# A tarefa é gravada na mesma transação de quem a enfileirou: se a
+# requisição der rollback, a tarefa some junto. O nome é o caminho de
+# import da função, então o worker não precisa de registro prévio.
+def task(max_attempts=5, backoff=30):
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def delay(*args, **kwargs):
+            if settings.TASKS_ALWAYS_EAGER:
+                transaction.on_commit(lambda: run_eager(name, func, args, kwargs))
+                return None
+            return Task.objects.create(
+                name=name,
+                args=list(args),
+                kwargs=kwargs,
+                max_attempts=max_attempts,
+                run_at=timezone.now(),
+            )
+
+        func.delay = delay
+        func.backoff = backoff
+        return func
+
+    return decorator
+
+
+def run_eager(name, func, args, kwargs):
+    # Modo eager (padrão com DEBUG): a tarefa roda no on_commit da própria
+    # requisição. Um erro aqui viraria 500 numa operação que já foi gravada;
+    # como no worker, ele só é registrado.
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Tarefa %s falhou (modo eager).", name)
+
+
+# =========================
+# Worker
+# =========================
+def retry_delay(func, attempts):
+    # Backoff exponencial: backoff, 2x, 4x... até TASK_BACKOFF_CAP segundos.
+    return min(getattr(func, "backoff", 30) * 2 ** (attempts - 1), TASK_BACKOFF_CAP)
+
+
+def requeue_stale():
+    # Worker que morreu no meio: a tarefa volta para a fila depois do timeout.
+    # Se já gastou as tentativas, falha de vez; senão uma tarefa que derruba o
+    # worker (OOM, segfault) nunca chega ao FAILED do run_task e roda para sempre.
+    stale = Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT)
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Task.FAILED,
+        last_error=f"Worker não terminou em {settings.TASK_TIMEOUT}s (tentativas esgotadas).",
+    )
+    if failed:
+        logger.error("%s tarefa(s) travada(s) falharam de vez.", failed)
+    return stale.update(status=Task.PENDING)
+
+
+def claim_next():
+    # O UPDATE condicional garante que só um worker pega cada tarefa, no
+    # PostgreSQL e no SQLite (sem depender de SELECT ... FOR UPDATE).
+    now = timezone.now()
+    due = Task.objects.filter(status=Task.PENDING, run_at__lte=now).order_by("run_at", "id")
+    for pk in due.values_list("pk", flat=True)[:10]:
+        claimed = Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, locked_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run_task(task_row):
+    func = None
+    try:
+        func = import_string(task_row.name)
+        func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if task_row.attempts >= task_row.max_attempts:
+            task_row.status = Task.FAILED
+            logger.error("Tarefa %s (#%s) falhou de vez:\n%s", task_row.name, task_row.pk, error)
+        else:
+            task_row.status = Task.PENDING
+            task_row.run_at = timezone.now() + timedelta(seconds=retry_delay(func, task_row.attempts))
+            logger.warning("Tarefa %s (#%s) falhou, nova tentativa em %s", task_row.name, task_row.pk, task_row.run_at)
+        task_row.last_error = error
+        task_row.save(update_fields=["status", "run_at", "last_error"])
+        return False
+
+    # Concluída: sai da fila (as que falharam ficam para consulta no admin).
+    task_row.delete()
+    return True
+
+
+def run_pending(limit=None):
+    processed = 0
+    requeue_stale()
+    while limit is None or processed < limit:
+        task_row = claim_next()
+        if task_row is None:
+            break
+        try:
+            run_task(task_row)
+        finally:
+            close_old_connections()
+        processed += 1
+    return processed
@@ -0,0 +1,35 @@
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+DEFAULT_SIZES = "(min-width: 1024px) 768px, 100vw"
+
+
+def _srcset(storage, names):
+    return ", ".join(f"{storage.url(name)} {width}w" for width, name in sorted(names.items(), key=lambda i: int(i[0])))
+
+
+@register.simple_tag
+def responsive_image(field, renditions, alt="", css_class="", sizes=DEFAULT_SIZES):
+    # Enquanto as versões não ficam prontas (ou se falharam), serve o arquivo original.
+    if not field:
+        return ""
+    if not renditions or renditions.get("source") != field.name or renditions.get("failed"):
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', field.url, alt, css_class)
+
+    storage = field.storage
+    largest = max(renditions["jpeg"], key=int)
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy">'
+        '</picture>',
+        _srcset(storage, renditions["webp"]),
+        sizes,
+        storage.url(renditions["jpeg"][largest]),
+        _srcset(storage, renditions["jpeg"]),
+        sizes,
+        alt,
+        css_class,
+    )
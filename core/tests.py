@@ -1,3 +1,1153 @@
-from django.test import TestCase
+import csv
+import json
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest import mock
+from io import BytesIO, StringIO
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, router
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from .benchmarks import find_regressions, load_baseline, run_benchmarks
+from .counters import recount_counters
+from .cursors import encode_cursor
+from .feed import feed_page
+from .models import Comment, CommentLike, Like, Post, Profile, Task, TimelineEntry, UserPost, UserPostComment, UserPostLike
+from .moderation import moderate, moderation_page, pending_user_posts
+from .pagecache import cache_stats
+from .ratelimit import quota_left, release_quota, take_quota
+from .replicas import PIN_COOKIE, read_from_replica
+from .search import search_queryset
+from .tasks import requeue_stale, run_pending, task
+from .timelines import build_timeline, timeline_page, trim_timelines
+from .urls import core_urlpatterns
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:  # moto é só para testes
+    mock_aws = None
+
+# O manifest em staticfiles/ só existe depois do collectstatic do deploy.
+TEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+# Réplicas desligadas: nos testes elas espelham o default, mas fora da
+# transação do TestCase (ver ReplicaDatabaseTests).
+@override_settings(STORAGES=TEST_STORAGES, REPLICA_DATABASES=[])
+class SiteTestCase(TestCase):
+    def setUp(self):
+        # O cache de páginas sobrevive ao rollback de cada teste.
+        cache.clear()
+
+
+def make_cards(n, author, commenter, prefix="card"):
+    for i in range(n):
+        post = Post.objects.create(title=f"{prefix} {i}", slug=f"{prefix}-{i}", content="texto")
+        Like.objects.create(post=post, user=commenter)
+        Comment.objects.create(post=post, user=commenter, content="oi")
+
+        up = UserPost.objects.create(user=author, title=f"{prefix} user {i}", content="texto", is_approved=True)
+        UserPostLike.objects.create(post=up, user=commenter)
+        UserPostComment.objects.create(post=up, user=commenter, content="oi")
+
+
+# =========================
+# Feed
+# =========================
+class FeedQueryCountTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user("autor", password="x")
+        self.commenter = User.objects.create_user("leitor", password="x")
+
+    def assertFeedQueries(self, cards):
+        # 2 agregações de Last-Modified + 2 streams do merge + 1 prefetch de
+        # comentários por tipo de post
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse("feed"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["combined_posts"]), cards)
+        return response
+
+    def test_query_count_does_not_grow_with_cards(self):
+        make_cards(2, self.author, self.commenter, prefix="a")
+        self.assertFeedQueries(4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_cards(8, self.author, self.commenter, prefix="b")
+        response = self.assertFeedQueries(20)
+        self.assertContains(response, "Curtir (1)", count=20)
+        self.assertContains(response, "Comentários (1)", count=20)
+
+
+class FeedCursorTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create_user("autor", password="x")
+        # Três instantes compartilhados pelas duas fontes: o desempate por
+        # (type, id) tem de atravessar as páginas sem repetir nem pular itens.
+        instants = [timezone.now() - timedelta(minutes=m) for m in (1, 2, 3)]
+        for i in range(9):
+            post = Post.objects.create(title=f"Oficial {i}", slug=f"oficial-{i}", content="texto")
+            up = UserPost.objects.create(user=author, title=f"Usuario {i}", content="texto", is_approved=True)
+            Post.objects.filter(pk=post.pk).update(created_at=instants[i % 3])
+            UserPost.objects.filter(pk=up.pk).update(created_at=instants[i % 3])
+
+    def test_walking_the_cursor_returns_every_item_once_in_order(self):
+        expected = sorted(
+            [(p.created_at, "oficial", p.pk) for p in Post.objects.all()]
+            + [(p.created_at, "usuario", p.pk) for p in UserPost.objects.all()],
+            reverse=True,
+        )
+        for size in (4, 5, 7):
+            seen, cursor = [], None
+            while True:
+                page = feed_page(cursor, size=size)
+                seen += [(item["obj"].created_at, item["type"], item["obj"].pk) for item in page.items]
+                cursor = page.next_cursor
+                if not cursor:
+                    break
+            self.assertEqual(seen, expected, size)
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        for cursor in ("lixo!", encode_cursor("ontem", "oficial", 1), encode_cursor("2025-01-01T00:00:00")):
+            for name in ("feed", "feed_json"):
+                response = self.client.get(reverse(name), {"cursor": cursor})
+                self.assertEqual(response.status_code, 400, (name, cursor))
+
+
+# =========================
+# Contadores desnormalizados
+# =========================
+class CounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("leitor", password="x")
+        self.post = Post.objects.create(title="Post", slug="post", content="texto")
+
+    def test_counters_follow_creates_and_deletes(self):
+        like = Like.objects.create(post=self.post, user=self.user)
+        comment = Comment.objects.create(post=self.post, user=self.user, content="oi")
+        reply = Comment.objects.create(post=self.post, user=self.user, content="re", parent=comment)
+        CommentLike.objects.create(comment=comment, user=self.user)
+
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 2))
+        self.assertEqual((comment.likes_count, comment.replies_count), (1, 1))
+
+        like.delete()
+        reply.delete()
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (0, 1))
+        self.assertEqual(comment.replies_count, 0)
+
+    def test_recount_repairs_drift(self):
+        Like.objects.create(post=self.post, user=self.user)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7, comments_count=3)
+
+        call_command("recount_counters", stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 0))
+
+
+# =========================
+# Comentários paginados
+# =========================
+class CommentThreadTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("leitor", password="x")
+        self.post = Post.objects.create(title="Post", slug="post", content="texto")
+
+    def test_top_level_comments_are_paginated_by_cursor(self):
+        for i in range(25):
+            Comment.objects.create(post=self.post, user=self.user, content=f"comentário {i}")
+        url = reverse("post_detail", args=[self.post.slug])
+
+        # Last-Modified + post + página de comentários de primeiro nível
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context["comments"]), 20)
+
+        response = self.client.get(url, {"cursor": response.context["next_cursor"], "partial": 1})
+        self.assertEqual(len(response.context["comments"]), 5)
+        self.assertIsNone(response.context["next_cursor"])
+        self.assertContains(response, "comentário 0")
+
+    def test_replies_load_lazily_at_any_depth(self):
+        root = parent = Comment.objects.create(post=self.post, user=self.user, content="raiz")
+        for depth in range(1, 4):
+            parent = Comment.objects.create(post=self.post, user=self.user, content=f"nivel {depth}", parent=parent)
+
+        response = self.client.get(reverse("post_detail", args=[self.post.slug]))
+        self.assertNotContains(response, "nivel 1")
+        self.assertContains(response, reverse("comment_replies", args=[root.pk]))
+
+        data = self.client.get(reverse("comment_replies", args=[root.pk])).json()
+        self.assertEqual([r["content"] for r in data["results"]], ["nivel 1"])
+        self.assertEqual(data["results"][0]["replies_count"], 1)
+        self.assertIn("Ver respostas (1)", data["results"][0]["html"])
+
+
+# =========================
+# Curtidas
+# =========================
+class LikeToggleTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("leitor", password="x")
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(title="Post", slug="post", content="texto")
+
+    def test_json_toggle_returns_state_and_count(self):
+        url = reverse("like_post", args=[self.post.pk])
+
+        response = self.client.post(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json(), {"liked": True, "count": 1})
+
+        response = self.client.post(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json(), {"liked": False, "count": 0})
+        self.assertFalse(Like.objects.exists())
+
+    def test_explicit_state_is_idempotent(self):
+        url = reverse("like_post", args=[self.post.pk])
+        for _ in range(2):
+            response = self.client.post(url, {"liked": "true"}, HTTP_ACCEPT="application/json")
+            self.assertEqual(response.json(), {"liked": True, "count": 1})
+        for _ in range(2):
+            response = self.client.post(url, {"liked": "false"}, HTTP_ACCEPT="application/json")
+            self.assertEqual(response.json(), {"liked": False, "count": 0})
+        self.assertFalse(Like.objects.exists())
+
+    def test_unlike_is_a_single_delete_without_reloading_the_target(self):
+        author = User.objects.create_user("autor")
+        up = UserPost.objects.create(user=author, title="Comunidade", content="texto", is_approved=True)
+        comment = Comment.objects.create(post=self.post, user=author, content="oi")
+        UserPostLike.objects.create(post=up, user=self.user)
+        CommentLike.objects.create(comment=comment, user=self.user)
+
+        for name, pk, table in (("like_user_post", up.pk, "core_userpostlike"), ("like_comment", comment.pk, "core_commentlike")):
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse(name, args=[pk]), {"liked": "false"}, HTTP_ACCEPT="application/json")
+            self.assertEqual(response.json(), {"liked": False, "count": 0})
+            sql = [q["sql"] for q in queries.captured_queries]
+            self.assertEqual(sum(f'DELETE FROM "{table}"' in q for q in sql), 1, sql)
+            self.assertFalse([q for q in sql if q.startswith("SELECT") and f'FROM "{table}"' in q], sql)
+            # Sessão, usuário, alvo (com select_related) e o contador devolvido
+            self.assertEqual(sum(q.startswith("SELECT") for q in sql), 4, sql)
+
+    def test_form_post_still_redirects(self):
+        response = self.client.post(reverse("like_post", args=[self.post.pk]))
+        self.assertRedirects(response, reverse("post_detail", args=[self.post.slug]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_pages_show_what_the_user_liked(self):
+        author = User.objects.create_user("autor")
+        make_cards(6, author, author)
+        liked_post = Post.objects.get(slug="card-2")
+        liked_user_post = UserPost.objects.get(title="card user 4")
+        Like.objects.create(post=liked_post, user=self.user)
+        UserPostLike.objects.create(post=liked_user_post, user=self.user)
+        CommentLike.objects.create(comment=liked_post.comments.get(), user=self.user)
+
+        # Uma consulta por modelo de curtida, qualquer que seja o tamanho da página
+        with CaptureQueriesContext(connection) as queries:
+            feed = self.client.get(reverse("feed_json")).json()["results"]
+        like_queries = [q for q in queries.captured_queries if 'like"."user_id" = ' in q["sql"]]
+        self.assertEqual(len(like_queries), 2)
+        liked = {(item["type"], item["id"]) for item in feed if item["liked"]}
+        self.assertEqual(liked, {("oficial", liked_post.pk), ("usuario", liked_user_post.pk)})
+
+        response = self.client.get(reverse("post_detail", args=[liked_post.slug]))
+        self.assertTrue(response.context["user_liked"])
+        self.assertEqual([c.liked_by_me for c in response.context["comments"]], [True])
+        response = self.client.get(reverse("profile", args=[author.username]))
+        self.assertContains(response, 'aria-pressed="true"', count=1)
+
+
+# =========================
+# Cache de páginas
+# =========================
+class PageCacheTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("leitor", password="x")
+        self.post = Post.objects.create(title="Post", slug="post", content="texto")
+        self.url = reverse("post_detail", args=[self.post.slug])
+
+    def test_anonymous_pages_are_served_from_cache_until_invalidated(self):
+        self.client.get(self.url)
+        # Só a agregação do Last-Modified
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertNotContains(response, "csrfmiddlewaretoken")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, user=self.user, content="novo comentário")
+        self.assertContains(self.client.get(self.url), "novo comentário")
+        self.assertEqual(cache_stats()["post_detail"], {"hits": 1, "misses": 2, "hit_ratio": 0.3333})
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertContains(response, "csrfmiddlewaretoken")
+
+    def test_card_fragments_follow_the_object_version(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse("feed")), "Post")
+
+        self.post.title = "Título novo"
+        self.post.save()
+        self.assertContains(self.client.get(reverse("feed")), "Título novo")
+
+
+# =========================
+# GET condicional
+# =========================
+class ConditionalGetTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("leitor", password="x")
+        self.post = Post.objects.create(title="Post", slug="post", content="texto")
+        self.url = reverse("post_detail", args=[self.post.slug])
+
+    def test_unchanged_page_returns_304(self):
+        response = self.client.get(self.url)
+        self.assertIn("Cookie", response["Vary"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_data_and_viewer(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(post=self.post, user=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+
+# =========================
+# Versões das imagens
+# =========================
+class ImageRenditionTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(MEDIA_ROOT=media_root, TASKS_ALWAYS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user("autor", password="x")
+
+    def photo(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Câmera do celular"
+        buffer = BytesIO()
+        Image.new("RGB", (1200, 800), "green").save(buffer, format="JPEG", exif=exif)
+        return SimpleUploadedFile("foto.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def test_renditions_are_resized_without_exif_and_used_in_srcset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            up = UserPost.objects.create(user=self.user, title="Foto", content="x", image=self.photo(), is_approved=True)
+        up.refresh_from_db()
+
+        self.assertEqual(up.image_renditions["source"], up.image.name)
+        self.assertEqual(sorted(up.image_renditions["webp"], key=int), ["480", "960"])
+        with up.image.storage.open(up.image_renditions["jpeg"]["480"]) as fh:
+            rendition = Image.open(fh)
+            self.assertEqual(rendition.width, 480)
+            self.assertEqual(len(rendition.getexif()), 0)
+
+        self.assertContains(self.client.get(reverse("feed")), 'type="image/webp"')
+
+    def test_failed_rendition_is_logged_and_marked_in_eager_mode(self):
+        broken = SimpleUploadedFile("quebrada.jpg", b"nao e imagem", content_type="image/jpeg")
+        with self.assertLogs("core.tasks", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+            up = UserPost.objects.create(user=self.user, title="Foto", content="x", image=broken, is_approved=True)
+        up.refresh_from_db()
+
+        self.assertEqual(up.image_renditions, {"source": up.image.name, "failed": True})
+        response = self.client.get(reverse("feed"))
+        self.assertContains(response, f'src="{up.image.url}"')
+        self.assertNotContains(response, 'type="image/webp"')
+
+
+# =========================
+# Upload direto (URL pré-assinada)
+# =========================
+S3_STORAGES = {
+    **TEST_STORAGES,
+    "default": {"BACKEND": "storages.backends.s3boto3.S3Boto3Storage"},
+}
+
+
+@unittest.skipIf(mock_aws is None, "moto não instalado")
+@override_settings(
+    USE_S3=True,
+    STORAGES=S3_STORAGES,
+    AWS_ACCESS_KEY_ID="teste",
+    AWS_SECRET_ACCESS_KEY="teste",
+    AWS_STORAGE_BUCKET_NAME="sqm-teste",
+    AWS_S3_REGION_NAME="us-east-1",
+)
+class DirectUploadTests(TestCase):
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket="sqm-teste")
+
+        self.user = User.objects.create_user("autor", password="x")
+        self.client.force_login(self.user)
+        cache.clear()  # contadores de limite e cota
+
+    def png(self):
+        buffer = BytesIO()
+        Image.new("RGB", (10, 10), "green").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def upload(self, body):
+        upload = self.client.post(reverse("user_post_upload_url"), {"content_type": "image/png"}).json()
+        self.s3.put_object(Bucket="sqm-teste", Key=upload["key"], Body=body)
+        return upload["key"]
+
+    def test_presigned_upload_is_attached_to_the_post(self):
+        response = self.client.post(reverse("user_post_upload_url"), {"content_type": "image/png"})
+        upload = response.json()
+        self.assertTrue(upload["key"].startswith(f"user_posts/uploads/{self.user.pk}/"))
+        self.assertEqual(upload["fields"]["Content-Type"], "image/png")
+
+        # O navegador envia direto ao bucket
+        self.s3.put_object(Bucket="sqm-teste", Key=upload["key"], Body=self.png())
+
+        response = self.client.post(reverse("create_user_post"), {
+            "title": "Com foto",
+            "content": "texto",
+            "image_key": upload["key"],
+        })
+        self.assertRedirects(response, reverse("profile", args=[self.user.username]), fetch_redirect_response=False)
+        self.assertEqual(UserPost.objects.get().image.name, upload["key"])
+
+    def test_keys_from_other_users_or_missing_objects_are_rejected(self):
+        for key in ("user_posts/uploads/999/x.png", f"user_posts/uploads/{self.user.pk}/faltando.png"):
+            response = self.client.post(reverse("create_user_post"), {
+                "title": "Com foto",
+                "content": "texto",
+                "image_key": key,
+            })
+            self.assertEqual(response.status_code, 200)
+        self.assertFalse(UserPost.objects.exists())
+
+    def test_non_image_bytes_are_rejected_and_deleted(self):
+        for body in (b"png", b"GIF89a" + b"x" * 100):
+            key = self.upload(body)
+            response = self.client.post(reverse("create_user_post"), {"title": "Falsa", "content": "texto", "image_key": key})
+            self.assertContains(response, "não é uma imagem válida")
+            self.assertEqual(self.s3.list_objects_v2(Bucket="sqm-teste", Prefix=key)["KeyCount"], 0)
+        self.assertFalse(UserPost.objects.exists())
+
+    def test_no_upload_urls_without_quota(self):
+        UserPost.objects.create(user=self.user, title="Hoje", content="texto")
+        response = self.client.post(reverse("user_post_upload_url"), {"content_type": "image/png"})
+        self.assertEqual(response.status_code, 429)
+
+    def test_cleanup_deletes_only_unattached_old_uploads(self):
+        attached, orphan = self.upload(self.png()), self.upload(self.png())
+        UserPost.objects.create(user=self.user, title="Com foto", content="texto", image=attached)
+        out = StringIO()
+        call_command("cleanup_uploads", older_than_hours=0, stdout=out)
+        self.assertIn("1 envio(s)", out.getvalue())
+        keys = [obj["Key"] for obj in self.s3.list_objects_v2(Bucket="sqm-teste")["Contents"]]
+        self.assertIn(attached, keys)
+        self.assertNotIn(orphan, keys)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class DirectUploadFallbackTests(TestCase):
+    def test_upload_url_is_unavailable_without_s3(self):
+        self.client.force_login(User.objects.create_user("autor", password="x"))
+        response = self.client.post(reverse("user_post_upload_url"), {"content_type": "image/png"})
+        self.assertEqual(response.status_code, 404)
+
+
+# =========================
+# Busca
+# =========================
+class SearchTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("leitor", password="x")
+        self.title_hit = Post.objects.create(title="Sensibilidade química", slug="sq", content="texto")
+        self.body_hit = Post.objects.create(title="Outro", slug="outro", content="fala de sensibilidade")
+        Post.objects.create(title="Sensibilidade rascunho", slug="rascunho", content="x", published=False)
+        UserPost.objects.create(user=self.user, title="Pendente", content="sensibilidade", is_approved=False)
+        self.comment = Comment.objects.create(post=self.body_hit, user=self.user, content="Minha sensibilidade piorou")
+
+    def test_search_ranks_public_content_and_ignores_accents(self):
+        response = self.client.get(reverse("search"), {"q": "quimica"})
+        self.assertEqual([item["obj"] for item in response.context["page"].items], [self.title_hit])
+
+        items = self.client.get(reverse("search"), {"q": "sensibilidade"}).context["page"].items
+        self.assertEqual(items[0]["obj"], self.title_hit)
+        self.assertCountEqual([item["obj"] for item in items], [self.title_hit, self.body_hit, self.comment])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.body_hit.content = "agora sobre fragrâncias"
+        self.body_hit.save()
+        self.comment.delete()
+        results = search_queryset(Post.objects.all(), "fragrancia")
+        self.assertEqual(list(results), [self.body_hit])
+        self.assertFalse(search_queryset(Comment.objects.all(), "piorou").exists())
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "triggers do FTS5")
+    def test_counter_updates_do_not_touch_the_fts_row(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'core_post_fts_au'")
+            self.assertIn("AFTER UPDATE OF title, summary, content ON", cursor.fetchone()[0])
+
+    def test_admin_search_uses_the_index(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:core_post_changelist"), {"q": "quimica"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.title_hit])
+
+        # A condição aponta para a tabela da própria consulta, sem subconsulta correlacionada.
+        column = "search_vector" if connection.vendor == "postgresql" else "id IN (SELECT rowid"
+        listing = [q["sql"] for q in queries.captured_queries if f'"core_post".{column}' in q["sql"]]
+        self.assertTrue(listing)
+        for sql in listing:
+            self.assertNotIn("U0", sql)
+
+    def test_match_follows_the_alias_inside_subqueries(self):
+        nested = Post.objects.filter(pk__in=search_queryset(Post.objects.all(), "quimica").values("pk"))
+        sql = str(nested.query)
+        column = "search_vector" if connection.vendor == "postgresql" else "id IN (SELECT rowid"
+        self.assertIn(f"U0.{column}", sql)
+        self.assertNotIn(f'"core_post".{column}', sql)
+        self.assertEqual(list(nested), [self.title_hit])
+
+
+# =========================
+# Planos de consulta
+# =========================
+def query_plan(sql):
+    # Linhas do plano que indicam varredura completa ou ordenação fora de índice.
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Tabelas de teste são pequenas: sem isso o planner sempre prefere Seq Scan.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql)
+            plan = [row[0].strip() for row in cursor.fetchall()]
+            return [line for line in plan if "Seq Scan" in line or line.lstrip("-> ").startswith("Sort")]
+
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        plan = [row[3] for row in cursor.fetchall()]
+        return [line for line in plan if line.startswith("SCAN ") and " USING " not in line or "TEMP B-TREE" in line]
+
+
+class QueryPlanTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user("autor", password="x")
+        self.reader = User.objects.create_user("leitor", password="x")
+        make_cards(30, self.author, self.reader)
+        for comment in Comment.objects.all()[:5]:
+            Comment.objects.create(post=comment.post, user=self.author, content="resposta", parent=comment)
+
+    def test_hot_paths_use_indexes(self):
+        post = Post.objects.filter(comments__replies__isnull=False).first()
+        comment = Comment.objects.filter(post=post, parent=None).first()
+        # Fora da lista: /profiles/ lista a tabela inteira e /busca/ ordena por relevância.
+        urls = [
+            reverse("feed"),
+            reverse("feed") + "?cursor=" + self.client.get(reverse("feed_json")).json()["next_cursor"],
+            reverse("feed_json"),
+            reverse("post_detail", args=[post.slug]),
+            reverse("comment_replies", args=[comment.pk]),
+            reverse("profile", args=[self.author.username]),
+            reverse("create_user_post"),
+        ]
+        for user in (None, self.reader):
+            if user:
+                self.client.force_login(user)
+            for url in urls:
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                for query in queries.captured_queries:
+                    if not query["sql"].startswith("SELECT"):
+                        continue
+                    with self.subTest(url=url, user=user, sql=query["sql"][:200]):
+                        self.assertEqual(query_plan(query["sql"]), [])
+
+
+# =========================
+# Réplicas de leitura
+# =========================
+@read_from_replica
+def routed_db(request):
+    return HttpResponse(router.db_for_read(Post))
+
+
+@override_settings(REPLICA_DATABASES=["replica1"])
+class ReplicaRoutingTests(SiteTestCase):
+    def test_reads_go_to_replica_unless_writing_or_pinned(self):
+        factory = RequestFactory()
+        self.assertEqual(routed_db(factory.get("/")).content, b"replica1")
+        self.assertEqual(routed_db(factory.post("/")).content, b"default")
+        self.assertEqual(router.db_for_read(Post), "default")
+        self.assertEqual(router.db_for_write(Post), "default")
+
+        pinned = factory.get("/")
+        pinned.COOKIES[PIN_COOKIE] = "9999999999"
+        self.assertEqual(routed_db(pinned).content, b"default")
+
+    def test_writes_pin_the_browser_to_the_primary(self):
+        user = User.objects.create_user("leitor", password="x")
+        post = Post.objects.create(title="P", slug="p", content="x")
+        self.client.force_login(user)
+        response = self.client.post(reverse("like_post", args=[post.pk]))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+
+# Com dois arquivos SQLite fazendo papel de primário e réplica:
+#   DATABASE_URL=sqlite:///primary.sqlite3 DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 \
+#   python manage.py test core
+@unittest.skipUnless(settings.REPLICA_DATABASES, "sem DATABASE_REPLICA_URLS")
+@override_settings(STORAGES=TEST_STORAGES)
+class ReplicaDatabaseTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_read_views_query_the_replica_until_a_write(self):
+        replica = settings.REPLICA_DATABASES[0]
+        user = User.objects.create_user("leitor", password="x")
+        post = Post.objects.create(title="P", slug="p", content="x")
+
+        with override_settings(REPLICA_DATABASES=[replica]):
+            with CaptureQueriesContext(connections[replica]) as replica_queries:
+                self.client.get(reverse("post_detail", args=[post.slug]))
+            self.assertTrue(replica_queries.captured_queries)
+
+            self.client.force_login(user)
+            self.client.post(reverse("like_post", args=[post.pk]))
+            with CaptureQueriesContext(connections[replica]) as replica_queries:
+                self.client.get(reverse("post_detail", args=[post.slug]))
+            self.assertFalse(replica_queries.captured_queries)
+
+
+# =========================
+# Dados sintéticos
+# =========================
+class SeedDataTests(TestCase):
+    def test_seed_data_builds_consistent_trees_and_counters(self):
+        call_command(
+            "seed_data", users=20, posts=5, user_posts=10, comments=60, likes=80, batch_size=7, seed=1,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Comment.objects.count() + UserPostComment.objects.count(), 60)
+        self.assertTrue(Comment.objects.filter(parent__isnull=False).exists())
+        self.assertFalse(Comment.objects.filter(parent__isnull=False).exclude(parent__post=F("post")).exists())
+        # Contadores já batem: recount não tem o que corrigir
+        self.assertFalse(any(recount_counters().values()))
+
+
+# =========================
+# Benchmark por view (baseline em core/benchmark_baseline.json)
+# =========================
+class BenchmarkTests(SiteTestCase):
+    def test_views_have_no_n_plus_one_or_regressions(self):
+        # Versão curta do "manage.py benchmark", só com as contagens de consultas:
+        # tempo de parede depende da máquina. Atualize a baseline com --update-baseline.
+        results = run_benchmarks(sizes=(3, 12), runs=1)
+        self.assertEqual(set(results), set(load_baseline()))
+        self.assertEqual(find_regressions(results, load_baseline(), check_latency=False), [])
+
+
+# =========================
+# Profiling por requisição
+# =========================
+class RequestProfilingTests(SiteTestCase):
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse("feed"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_server_timing_log_and_sampled_profile(self):
+        Post.objects.create(title="P", slug="p", content="x")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+
+        with override_settings(
+            REQUEST_PROFILING=True,
+            REQUEST_PROFILING_SAMPLE_RATE=1,
+            REQUEST_PROFILING_SLOW_MS=0,
+            REQUEST_PROFILING_DIR=directory,
+        ), self.assertLogs("core.profiling", "INFO") as logs:
+            response = Client().get(reverse("post_detail", args=["p"]))
+
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, cache;desc')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "post_detail")
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["cache_misses"], 0)
+        self.assertEqual(len(list(Path(directory).glob("*-post_detail-*.prof"))), 1)
+
+
+# =========================
+# Métricas (/metrics)
+# =========================
+@override_settings(METRICS_TOKEN="segredo")
+class MetricsTests(SiteTestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_metrics_endpoint_reports_hot_paths(self):
+        author = User.objects.create_user("autor", password="x")
+        post = Post.objects.create(title="P", slug="p", content="x")
+        UserPost.objects.create(user=author, title="Fila", content="x")
+        likes = self.sample("sqm_writes_total", kind="like")
+        requests = self.sample("sqm_request_latency_seconds_count", view="post_detail", method="GET")
+
+        self.client.get(reverse("post_detail", args=[post.slug]))
+        self.client.get(reverse("post_detail", args=[post.slug]))
+        Like.objects.create(post=post, user=author)
+
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer segredo")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn("sqm_approval_queue_depth 1.0", body)
+        self.assertIn('sqm_page_cache_requests_total{result="hit",view="post_detail"}', body)
+        self.assertEqual(self.sample("sqm_writes_total", kind="like"), likes + 1)
+        self.assertEqual(
+            self.sample("sqm_request_latency_seconds_count", view="post_detail", method="GET"), requests + 2
+        )
+
+
+# =========================
+# Fila de tarefas
+# =========================
+FLAKY_CALLS = []
+
+
+@task(max_attempts=2, backoff=10)
+def flaky_task(value):
+    FLAKY_CALLS.append(value)
+    raise RuntimeError("falhou")
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class TaskQueueTests(SiteTestCase):
+    def test_signup_email_is_sent_by_the_worker(self):
+        self.client.post(reverse("account_signup"), {
+            "email": "nova@example.com",
+            "username": "nova",
+            "password1": "senha-forte-123",
+            "password2": "senha-forte-123",
+        })
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Task.objects.get().name, "core.emails.send_email")
+
+        call_command("run_tasks", once=True, stdout=StringIO())
+        self.assertEqual(mail.outbox[0].to, ["nova@example.com"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failures_back_off_then_give_up(self):
+        FLAKY_CALLS.clear()
+        task_row = flaky_task.delay("x")
+        with self.assertLogs("core.tasks", "WARNING"):
+            run_pending()
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), (Task.PENDING, 1))
+        self.assertGreater(task_row.run_at, timezone.now() + timedelta(seconds=5))
+
+        # Ainda não venceu: o worker não pega de novo
+        self.assertEqual(run_pending(), 0)
+        Task.objects.filter(pk=task_row.pk).update(run_at=timezone.now())
+        with self.assertLogs("core.tasks", "ERROR"):
+            run_pending()
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.FAILED)
+        self.assertIn("RuntimeError", task_row.last_error)
+        self.assertEqual(FLAKY_CALLS, ["x", "x"])
+
+    def test_stale_tasks_are_requeued_until_attempts_run_out(self):
+        stale = timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT + 1)
+        retry = flaky_task.delay("x")
+        exhausted = flaky_task.delay("x")
+        Task.objects.filter(pk=retry.pk).update(status=Task.RUNNING, locked_at=stale, attempts=1)
+        Task.objects.filter(pk=exhausted.pk).update(status=Task.RUNNING, locked_at=stale, attempts=exhausted.max_attempts)
+
+        with self.assertLogs("core.tasks", "ERROR"):
+            self.assertEqual(requeue_stale(), 1)
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retry.status, Task.PENDING)
+        self.assertEqual(exhausted.status, Task.FAILED)
+        self.assertIn("tentativas esgotadas", exhausted.last_error)
+
+
+# =========================
+# Fila de moderação
+# =========================
+class ModerationQueueTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.authors = [User.objects.create_user(f"autor{i}") for i in range(3)]
+        self.posts = [
+            UserPost.objects.create(user=self.authors[i % 3], title=f"Pendente {i}", content="texto")
+            for i in range(5)
+        ]
+        self.url = reverse("admin:core_userpost_moderation")
+
+    def test_keyset_pages_walk_the_queue_oldest_first(self):
+        with self.assertNumQueries(1), CaptureQueriesContext(connection) as queries:
+            first = moderation_page(size=3)
+            [post.user.profile for post in first.items]
+        self.assertEqual(query_plan(queries.captured_queries[0]["sql"]), [])
+        second = moderation_page(first.next_cursor, size=3)
+        self.assertEqual(first.items + second.items, self.posts)
+        self.assertIsNone(second.next_cursor)
+
+    def test_batched_actions_invalidate_the_feed(self):
+        self.assertNotContains(self.client.get(reverse("feed")), "Pendente 0")
+
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {"action": "approve", "ids": [self.posts[0].pk, self.posts[1].pk]})
+        self.assertRedirects(response, self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {"action": "reject", "ids": [self.posts[1].pk, self.posts[2].pk]})
+
+        # Reprovadas também saem da fila (moderated_at preenchido)
+        self.assertEqual(list(pending_user_posts().order_by("created_at")), self.posts[3:])
+        self.client.logout()
+        response = self.client.get(reverse("feed"))
+        self.assertContains(response, "Pendente 0")
+        self.assertNotContains(response, "Pendente 1")
+
+    def test_moderation_page_renders_for_staff_only(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url)
+        self.assertContains(response, "Pendente 4")
+        self.assertEqual(response.context["pending_count"], 5)
+
+
+# =========================
+# Timelines
+# =========================
+@override_settings(TIMELINES_ENABLED=True, TASKS_ALWAYS_EAGER=True)
+class TimelineTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author = User.objects.create_user("autor", password="x")
+            self.reader = User.objects.create_user("leitor", password="x")
+
+    def publish(self, n, prefix="Oficial"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Post.objects.create(title=f"{prefix} {i}", slug=f"{prefix.lower()}-{i}", content="texto") for i in range(n)]
+
+    def test_new_items_are_fanned_out_and_removed(self):
+        post, = self.publish(1)
+        self.assertEqual(TimelineEntry.objects.filter(object_id=post.pk).count(), 2)
+        self.client.force_login(self.reader)
+        self.assertContains(self.client.get(reverse("feed")), "Oficial 0")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.published = False
+            post.save()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertNotContains(self.client.get(reverse("feed")), "Oficial 0")
+
+    def test_pages_match_the_merged_feed_with_constant_queries(self):
+        make_cards(25, self.author, self.reader)
+        build_timeline(self.reader.pk)
+        page = timeline_page(self.reader)
+        following = timeline_page(self.reader, page.next_cursor)
+        merged = feed_page()
+        self.assertEqual([item["obj"] for item in page.items], [item["obj"] for item in merged.items])
+        self.assertEqual(page.next_cursor, merged.next_cursor)
+        # Entradas + uma consulta por tipo + comentários de cada tipo
+        with self.assertNumQueries(5), CaptureQueriesContext(connection) as queries:
+            timeline_page(self.reader, following.next_cursor)
+        self.assertEqual(query_plan(queries.captured_queries[0]["sql"]), [])
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_empty_timeline_is_built_once(self):
+        cache.clear()
+        Profile.objects.update(timeline_built_at=None)
+        self.client.force_login(self.reader)
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse("feed")).status_code, 200)
+        builds = Task.objects.filter(name="core.timelines.build_timeline")
+        self.assertEqual(builds.count(), 1)
+
+        # Montada e ainda vazia (nada publicado): não volta a enfileirar.
+        self.assertEqual(run_pending(), 1)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader).exists())
+        self.client.get(reverse("feed"))
+        self.assertFalse(builds.exists())
+
+    def test_users_without_a_built_timeline_keep_the_full_history(self):
+        old = self.publish(2, prefix="Antigo")
+        # Usuário de antes das timelines: nunca montada nem agendada
+        cache.clear()
+        Profile.objects.filter(user=self.reader).update(timeline_built_at=None)
+        TimelineEntry.objects.filter(user=self.reader).delete()
+        new, = self.publish(1, prefix="Novo")
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader).exists())
+
+        self.client.force_login(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse("feed"))
+        self.assertEqual([item["obj"] for item in response.context["combined_posts"]], [new, *reversed(old)])
+        # A montagem (agendada por essa visita) traz o histórico inteiro
+        self.assertEqual(TimelineEntry.objects.filter(user=self.reader).count(), 3)
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_moderation_schedules_one_task_per_chunk(self):
+        pending = [UserPost.objects.create(user=self.author, title=f"P{i}", content="texto") for i in range(5)]
+        Task.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            moderate([up.pk for up in pending], approve=True)
+        self.assertEqual(list(Task.objects.values_list("name", "args")), [
+            ("core.timelines.fan_out_items", ["usuario", [up.pk for up in pending]]),
+        ])
+        self.assertLess(len(queries), 10)
+
+        # Save parcial (versões das imagens) não consulta as timelines
+        with CaptureQueriesContext(connection) as queries:
+            pending[0].save(update_fields=["image_renditions"])
+        self.assertFalse([q for q in queries.captured_queries if "core_timelineentry" in q["sql"]])
+
+    def test_trim_keeps_the_newest_entries(self):
+        posts = self.publish(4)
+        self.assertEqual(trim_timelines([self.reader.pk], length=2), 2)
+        kept = TimelineEntry.objects.filter(user=self.reader).values_list("object_id", flat=True)
+        self.assertEqual(sorted(kept), [posts[2].pk, posts[3].pk])
+
+
+# =========================
+# Views assíncronas (ASGI)
+# =========================
+# URLs do deploy ASGI (ASYNC_VIEWS=True), para o AsyncViewTests.
+urlpatterns = [
+    path("", include(core_urlpatterns(async_views=True))),
+    path("accounts/", include("allauth.urls")),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user("autor", password="x")
+        self.reader = User.objects.create_user("leitor", password="x")
+        make_cards(3, self.author, self.reader)
+        self.post = Post.objects.get(slug="card-0")
+        self.urls = [
+            reverse("feed"),
+            reverse("feed_json"),
+            reverse("post_detail", args=[self.post.slug]),
+            reverse("profile", args=[self.author.username]),
+        ]
+
+    def test_read_views_match_the_sync_versions(self):
+        self.client.force_login(self.reader)
+        for url in self.urls:
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.get(reverse("post_detail", args=[self.post.slug]))
+        self.assertTrue(response.context["user_liked"])
+        self.assertEqual([c.content for c in response.context["comments"]], ["oi"])
+        async_feed = self.client.get(reverse("feed_json")).json()
+        with override_settings(ROOT_URLCONF="sqmbrasil.urls"):
+            self.assertEqual(self.client.get(reverse("feed_json")).json(), async_feed)
+
+    def test_anonymous_pages_still_use_the_cache(self):
+        url = reverse("post_detail", args=[self.post.slug])
+        self.client.get(url)
+        # Só a agregação do Last-Modified
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(url), "card 0")
+
+    def test_likes_and_comments(self):
+        self.client.force_login(self.reader)
+        url = reverse("like_post", args=[self.post.pk])
+        response = self.client.post(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json(), {"liked": False, "count": 0})
+        self.assertEqual(self.client.post(url, HTTP_ACCEPT="application/json").json(), {"liked": True, "count": 1})
+
+        response = self.client.post(reverse("post_detail", args=[self.post.slug]), {"comment": "via asgi"})
+        self.assertRedirects(response, reverse("post_detail", args=[self.post.slug]), fetch_redirect_response=False)
+        self.assertTrue(Comment.objects.filter(post=self.post, content="via asgi").exists())
+
+
+# =========================
+# Limites de tentativas e cota diária
+# =========================
+@override_settings(RATE_LIMITS_ENABLED=True, DAILY_POST_QUOTA=1)
+class RateLimitTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("leitor", password="x")
+        self.client.force_login(self.user)
+        self.post = Post.objects.create(title="Post", slug="post", content="texto")
+
+    @override_settings(RATE_LIMITS={**settings.RATE_LIMITS, "like": "2/m"})
+    def test_json_requests_over_the_limit_get_429_before_writing(self):
+        url = reverse("like_post", args=[self.post.pk])
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, HTTP_ACCEPT="application/json").status_code, 200)
+
+        # Só sessão e usuário: nada de curtida lida ou gravada
+        with self.assertNumQueries(2):
+            response = self.client.post(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+    @override_settings(RATE_LIMITS={**settings.RATE_LIMITS, "comment": "1/m"})
+    def test_form_posts_over_the_limit_redirect_with_a_message(self):
+        url = reverse("post_detail", args=[self.post.slug])
+        self.client.post(url, {"comment": "primeiro"})
+        response = self.client.post(url, {"comment": "segundo"}, HTTP_REFERER=url, follow=True)
+        self.assertRedirects(response, url)
+        self.assertContains(response, "Muitas tentativas")
+        self.assertEqual(list(Comment.objects.values_list("content", flat=True)), ["primeiro"])
+
+    @override_settings(RATE_LIMITS={**settings.RATE_LIMITS, "comment": "1/m"})
+    def test_falls_back_to_the_database_when_the_cache_is_down(self):
+        url = reverse("post_detail", args=[self.post.slug])
+        with mock.patch("core.ratelimit.cache") as broken, self.assertLogs("core.ratelimit", "WARNING"):
+            broken.add.side_effect = ConnectionError
+            self.client.post(url, {"comment": "primeiro"})
+            self.client.post(url, {"comment": "segundo"})
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_daily_quota_uses_the_local_day_and_ignores_invalid_forms(self):
+        # Postou às 23h30 de ontem (horário de Brasília): já é 02h30 UTC de hoje.
+        yesterday = UserPost.objects.create(user=self.user, title="Ontem", content="texto")
+        local_midnight = timezone.make_aware(timezone.datetime.combine(timezone.localdate(), timezone.datetime.min.time()))
+        UserPost.objects.filter(pk=yesterday.pk).update(created_at=local_midnight - timedelta(minutes=30))
+        self.assertEqual(quota_left(self.user), 1)
+
+        url = reverse("create_user_post")
+        self.assertEqual(self.client.post(url, {"title": "", "content": ""}).status_code, 200)
+        self.assertEqual(quota_left(self.user), 1)
+
+        profile = reverse("profile", args=[self.user.username])
+        self.assertRedirects(self.client.post(url, {"title": "Hoje", "content": "texto"}), profile, fetch_redirect_response=False)
+        self.assertEqual(quota_left(self.user), 0)
+        self.assertRedirects(self.client.get(url), profile, fetch_redirect_response=False)
+        self.assertEqual(UserPost.objects.filter(user=self.user).count(), 2)
+
+    def test_quota_is_counted_in_the_database(self):
+        url = reverse("create_user_post")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # Postagem gravada por outro worker (com o próprio LocMem)
+        UserPost.objects.create(user=self.user, title="Outro worker", content="texto")
+        self.client.post(url, {"title": "De novo", "content": "texto"})
+        self.assertEqual(UserPost.objects.filter(user=self.user).count(), 1)
+
+    def test_simultaneous_reservations_are_serialized(self):
+        self.assertTrue(take_quota(self.user))
+        self.assertFalse(take_quota(self.user))
+        release_quota(self.user)
+        self.assertTrue(take_quota(self.user))
+
+
+# =========================
+# Exportação
+# =========================
+class ExportTests(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user("autor", password="x")
+        make_cards(3, self.author, self.author)
+        old = Comment.objects.first()
+        Comment.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        self.old_comment = old.pk
+
+    def test_command_streams_csv_and_jsonl_with_date_filter(self):
+        out = StringIO()
+        call_command("export_data", "comments", stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["user__username"], "autor")
+
+        out = StringIO()
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        call_command("export_data", "comments", format="jsonl", since=since, stdout=out)
+        ids = [json.loads(line)["id"] for line in out.getvalue().splitlines()]
+        self.assertEqual(len(ids), 2)
+        self.assertNotIn(self.old_comment, ids)
+
+    def test_staff_endpoint_streams_and_validates(self):
+        url = reverse("export_data", args=["likes"])
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.author.is_staff = True
+        self.author.save()
+        response = self.client.get(url, {"format": "jsonl"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="likes.jsonl"')
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+        self.assertEqual(self.client.get(url, {"since": "ontem"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("export_data", args=["auth_user"])).status_code, 400)
+
+    async def test_asgi_streams_an_async_iterator(self):
+        await User.objects.filter(pk=self.author.pk).aupdate(is_staff=True)
+        await self.async_client.aforce_login(self.author)
+        response = await self.async_client.get(reverse("export_data", args=["comments"]), {"format": "jsonl"})
+        # Iterador síncrono no ASGI seria lido inteiro na memória antes do envio.
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 3)
+
+    def test_csv_neutralizes_formulas(self):
+        Comment.objects.filter(pk=self.old_comment).update(content="=HYPERLINK(\"http://x\")")
+        out = StringIO()
+        call_command("export_data", "comments", stdout=out)
+        contents = {row["id"]: row["content"] for row in csv.DictReader(StringIO(out.getvalue()))}
+        self.assertEqual(contents[str(self.old_comment)], "'=HYPERLINK(\"http://x\")")
@@ -0,0 +1,203 @@
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F, Q, Window
+from django.db.models.functions import Now, RowNumber
+
+from .cursors import decode_cursor, encode_cursor
+from .feed import FEED_PAGE_SIZE, FEED_SOURCES, FeedPage, afeed_page, feed_page, prefetch_comments
+from .models import Profile, TimelineEntry
+from .pagecache import invalidate
+from .tasks import task
+
+# Itens guardados por usuário; os mais antigos são descartados.
+TIMELINE_LENGTH = 500
+# Usuários por INSERT no fan-out
+TIMELINE_FANOUT_BATCH = 1000
+# O corte das timelines roda a cada N itens distribuídos (por id), não em
+# todos: entre dois cortes cada timeline passa do limite em até N entradas.
+TIMELINE_TRIM_EVERY = 20
+# Uma montagem pendente por usuário; se a tarefa falhar de vez, depois
+# desse tempo a próxima visita ao feed enfileira outra.
+TIMELINE_BUILD_RETRY = 600
+
+TIMELINE_ORDER = ("-created_at", "-kind", "-object_id")
+
+
+def _source(kind):
+    return dict(FEED_SOURCES)[kind]()
+
+
+# =========================
+# Escrita (fan-out pelo worker)
+# =========================
+def timeline_recipients(kind, obj):
+    # Hoje todo mundo vê tudo. Quando existir "seguir autores", é aqui que a
+    # lista vira os seguidores de obj.user (posts oficiais continuam para todos).
+    # Só timelines já montadas: uma entrada solta numa timeline nunca montada
+    # esconderia todo o histórico anterior (o feed passaria a ler só ela).
+    return User.objects.filter(is_active=True, profile__timeline_built_at__isnull=False)
+
+
+def trim_timelines(user_ids, length=TIMELINE_LENGTH):
+    ranked = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=F("user_id"),
+            order_by=[F(field[1:]).desc() for field in TIMELINE_ORDER],
+        ))
+        .filter(position__gt=length)
+        .values_list("pk", flat=True)
+    )
+    return TimelineEntry.objects.filter(pk__in=list(ranked)).delete()[0]
+
+
+@task(max_attempts=3)
+def fan_out(kind, pk):
+    obj = _source(kind).filter(pk=pk).first()
+    if obj is None:
+        return  # despublicado ou reprovado antes de o worker chegar aqui
+
+    # Keyset sobre os ids: cada lote é uma consulta curta e um INSERT.
+    recipients = timeline_recipients(kind, obj).order_by("pk").values_list("pk", flat=True)
+    last = 0
+    while batch := list(recipients.filter(pk__gt=last)[:TIMELINE_FANOUT_BATCH]):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, kind=kind, object_id=pk, created_at=obj.created_at) for user_id in batch],
+            ignore_conflicts=True,
+        )
+        if pk % TIMELINE_TRIM_EVERY == 0:
+            trim_timelines(batch)
+        last = batch[-1]
+    # ETag/Last-Modified dos logados seguem a geração do "feed".
+    invalidate("feed")
+
+
+@task(max_attempts=3)
+def fan_out_items(kind, pks):
+    for pk in pks:
+        fan_out(kind, pk)
+
+
+@task(max_attempts=3)
+def drop_from_timelines(kind, pk):
+    drop_items_from_timelines(kind, [pk])
+
+
+@task(max_attempts=3)
+def drop_items_from_timelines(kind, pks):
+    if TimelineEntry.objects.filter(kind=kind, object_id__in=pks).delete()[0]:
+        invalidate("feed")
+
+
+def _build_key(user_id):
+    return f"timeline:build:{user_id}"
+
+
+def timeline_built(user):
+    return Profile.objects.filter(user=user, timeline_built_at__isnull=False).exists()
+
+
+def request_timeline_build(user_id):
+    # Uma montagem pendente por usuário: recarregar o feed antes de o worker
+    # rodar não enfileira de novo.
+    if cache.add(_build_key(user_id), "pendente", TIMELINE_BUILD_RETRY):
+        build_timeline.delay(user_id)
+
+
+@task(max_attempts=3)
+def build_timeline(user_id):
+    # Timeline inicial (usuário novo, ou que já existia quando as timelines
+    # foram ligadas): os itens mais recentes de cada fonte, como no merge do
+    # feed. A marca vem antes da leitura: um fan-out que rode durante a
+    # montagem já inclui o usuário, e o que ele gravar o INSERT abaixo ignora.
+    Profile.objects.filter(user_id=user_id).update(timeline_built_at=Now())
+    streams = [
+        [(created_at, kind, pk) for created_at, pk in
+         _source(kind).order_by("-created_at", "-id").values_list("created_at", "pk")[:TIMELINE_LENGTH]]
+        for kind, _ in FEED_SOURCES
+    ]
+    latest = islice(heapq.merge(*streams, reverse=True), TIMELINE_LENGTH)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, kind=kind, object_id=pk, created_at=created_at)
+         for created_at, kind, pk in latest],
+        ignore_conflicts=True,
+    )
+
+
+def schedule_timeline_update(kind, pks, visible):
+    # pks: um item (save) ou um lote (moderação): uma consulta e no máximo
+    # uma tarefa para o lote inteiro.
+    if not settings.TIMELINES_ENABLED:
+        return
+    pks = [pks] if isinstance(pks, int) else sorted(pks)
+    # Edições de itens já distribuídos (ou já fora do ar) não geram tarefa.
+    distributed = set(
+        TimelineEntry.objects.filter(kind=kind, object_id__in=pks).values_list("object_id", flat=True).distinct()
+    )
+    if visible:
+        pending = [pk for pk in pks if pk not in distributed]
+        if pending:
+            fan_out_items.delay(kind, pending)
+    elif distributed:
+        drop_items_from_timelines.delay(kind, sorted(distributed))
+
+
+# =========================
+# Leitura
+# =========================
+def timeline_page(user, cursor=None, size=FEED_PAGE_SIZE):
+    # Mesmo cursor do feed (created_at, type, id): dá para alternar entre os dois.
+    position = decode_cursor(cursor, datetime.fromisoformat, str, int)
+    entries = TimelineEntry.objects.filter(user=user)
+    if position:
+        created_at, kind, pk = position
+        entries = entries.filter(
+            Q(created_at__lt=created_at)
+            | Q(created_at=created_at, kind__lt=kind)
+            | Q(created_at=created_at, kind=kind, object_id__lt=pk)
+        )
+    rows = list(entries.order_by(*TIMELINE_ORDER).values_list("created_at", "kind", "object_id")[: size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(*rows[-1])
+
+    # Uma consulta por tipo; itens que saíram do ar depois do fan-out somem aqui.
+    objects = {
+        kind: _source(kind).in_bulk([pk for _, row_kind, pk in rows if row_kind == kind])
+        for kind, _ in FEED_SOURCES
+    }
+    items = [
+        {"type": kind, "obj": objects[kind][pk]}
+        for _, kind, pk in rows if pk in objects[kind]
+    ]
+    prefetch_comments(
+        [item["obj"] for item in items if item["type"] == "oficial"],
+        [item["obj"] for item in items if item["type"] == "usuario"],
+    )
+    return FeedPage(items, next_cursor)
+
+
+def feed_for(user, cursor=None):
+    # Anônimos (e timelines desligadas) seguem no merge do feed, que tem cache.
+    if not settings.TIMELINES_ENABLED or not user.is_authenticated:
+        return feed_page(cursor)
+    # Até a montagem, o merge (a timeline ainda não tem o histórico).
+    if not timeline_built(user):
+        request_timeline_build(user.pk)
+        return feed_page(cursor)
+    return timeline_page(user, cursor)
+
+
+async def afeed_for(user, cursor=None):
+    if not settings.TIMELINES_ENABLED or not user.is_authenticated:
+        return await afeed_page(cursor)
+    # A timeline pode enfileirar a montagem (tarefa gravada na transação): fica síncrona.
+    return await sync_to_async(feed_for)(user, cursor)
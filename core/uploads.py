@@ -0,0 +1,121 @@
+import posixpath
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+
+from .metrics import record_upload
+from .models import UserPost
+
+ALLOWED_IMAGE_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+# Formato real do arquivo (Pillow) aceito para cada extensão da chave
+IMAGE_FORMATS = {".jpg": "JPEG", ".png": "PNG", ".webp": "WEBP", ".gif": "GIF"}
+UPLOAD_URL_EXPIRES = 600
+UPLOAD_PREFIX = "user_posts/uploads/"
+
+
+# =========================
+# Upload direto para o bucket (URL pré-assinada)
+# =========================
+def direct_uploads_enabled():
+    # Com FileSystemStorage (USE_S3 desligado) o upload continua passando pelo servidor.
+    return settings.USE_S3
+
+
+def _user_prefix(user):
+    return f"{UPLOAD_PREFIX}{user.pk}/"
+
+
+def _bucket_key(key):
+    return posixpath.join(default_storage.location, key) if default_storage.location else key
+
+
+def presigned_upload(user, content_type):
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        raise ValueError("Formato de imagem não suportado.")
+
+    key = f"{_user_prefix(user)}{uuid.uuid4().hex}{ALLOWED_IMAGE_TYPES[content_type]}"
+    client = default_storage.connection.meta.client
+    post = client.generate_presigned_post(
+        Bucket=default_storage.bucket_name,
+        Key=_bucket_key(key),
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, settings.MAX_UPLOAD_SIZE],
+        ],
+        ExpiresIn=UPLOAD_URL_EXPIRES,
+    )
+    return {"url": post["url"], "fields": post["fields"], "key": key}
+
+
+def validate_upload(user, key):
+    # A chave vem do navegador: confere dono, existência e tamanho no bucket.
+    if not direct_uploads_enabled():
+        raise ValueError("Upload direto indisponível.")
+    if not key.startswith(_user_prefix(user)) or ".." in key:
+        raise ValueError("Upload inválido.")
+    # exists() do S3Storage responde False sem consultar o bucket quando
+    # file_overwrite está ligado; o HEAD de size() confirma de verdade.
+    try:
+        size = default_storage.size(key)
+    except FileNotFoundError:
+        raise ValueError("O envio da imagem não foi concluído.")
+    if size > settings.MAX_UPLOAD_SIZE:
+        default_storage.delete(key)
+        raise ValueError("A imagem excede o tamanho máximo permitido.")
+    # O Content-Type assinado é só o que o navegador declarou: confere os bytes
+    # como o ImageField faz no upload pelo servidor.
+    if not _is_image(key):
+        default_storage.delete(key)
+        raise ValueError("O arquivo enviado não é uma imagem válida.")
+    record_upload("direto", size)
+    return key
+
+
+def _is_image(key):
+    expected = IMAGE_FORMATS.get(posixpath.splitext(key)[1])
+    try:
+        with default_storage.open(key) as fh:
+            image = Image.open(fh)
+            image.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return False
+    return image.format == expected
+
+
+# =========================
+# Limpeza de envios nunca anexados
+# =========================
+def orphan_uploads(older_than):
+    # Chaves em user_posts/uploads/ mais antigas que older_than e que nenhuma
+    # postagem usa (URL assinada e abandonada, formulário nunca enviado).
+    client = default_storage.connection.meta.client
+    prefix = _bucket_key(UPLOAD_PREFIX)
+    strip = len(_bucket_key(""))
+    cutoff = timezone.now() - older_than
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=default_storage.bucket_name, Prefix=prefix):
+        old = [obj["Key"][strip:] for obj in page.get("Contents", []) if obj["LastModified"] < cutoff]
+        used = set(UserPost.objects.filter(image__in=old).values_list("image", flat=True))
+        yield [key for key in old if key not in used]
+
+
+def delete_orphan_uploads(older_than=timedelta(days=1)):
+    client = default_storage.connection.meta.client
+    deleted = 0
+    for keys in orphan_uploads(older_than):
+        if keys:
+            client.delete_objects(
+                Bucket=default_storage.bucket_name,
+                Delete={"Objects": [{"Key": _bucket_key(key)} for key in keys], "Quiet": True},
+            )
+            deleted += len(keys)
+    return deleted
@@ -1,20 +1,41 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
-urlpatterns = [
-    path("", views.home, name="feed"),
-    path("post/<slug:slug>/", views.post_detail, name="post_detail"),
-    path("post/<int:post_id>/like/", views.like_post, name="like_post"),
-    path("comment/<int:comment_id>/like/", views.like_comment, name="like_comment"),
-    path("comment/<int:comment_id>/reply/", views.reply_comment, name="reply_comment"),
-
-    # Perfis
-    path("profile/edit/", views.edit_profile, name="edit_profile"),
-    path("profile/<str:username>/", views.profile, name="profile"),
-    path("profiles/", views.profiles_list, name="profiles_list"),
-
-    # Postagens da comunidade
-    path("postar/", views.create_user_post, name="create_user_post"),
-    path("userpost/<int:post_id>/like/", views.like_user_post, name="like_user_post"),
-    path("userpost/<int:post_id>/comment/", views.comment_user_post, name="comment_user_post"),
-]
+
+def core_urlpatterns(async_views=False):
+    # Deploy ASGI (ASYNC_VIEWS=True): leituras e curtidas usam as variantes async.
+    def view(name):
+        return getattr(views, f"{name}_async" if async_views else name)
+
+    return [
+        path("", view("home"), name="feed"),
+        path("feed.json", view("feed_json"), name="feed_json"),
+        path("post/<slug:slug>/", view("post_detail"), name="post_detail"),
+        path("post/<int:post_id>/like/", view("like_post"), name="like_post"),
+        path("comment/<int:comment_id>/like/", view("like_comment"), name="like_comment"),
+        path("comment/<int:comment_id>/reply/", views.reply_comment, name="reply_comment"),
+        path("comment/<int:comment_id>/replies/", view("comment_replies"), name="comment_replies"),
+
+        # Perfis
+        path("profile/edit/", views.edit_profile, name="edit_profile"),
+        path("profile/<str:username>/", view("profile"), name="profile"),
+        path("profiles/", views.profiles_list, name="profiles_list"),
+
+        # Postagens da comunidade
+        path("postar/", views.create_user_post, name="create_user_post"),
+        path("postar/upload/", views.user_post_upload_url, name="user_post_upload_url"),
+        path("userpost/<int:post_id>/like/", view("like_user_post"), name="like_user_post"),
+        path("userpost/<int:post_id>/comment/", views.comment_user_post, name="comment_user_post"),
+
+        # Busca
+        path("busca/", views.search_view, name="search"),
+
+        # Interno
+        path("interno/cache/", views.cache_stats_view, name="cache_stats"),
+        path("interno/exportar/<str:table>/", views.export_view, name="export_data"),
+        path("metrics", views.metrics_view, name="metrics"),
+    ]
+
+
+urlpatterns = core_urlpatterns(settings.ASYNC_VIEWS)
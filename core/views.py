@@ -1,81 +1,168 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.utils.timezone import now
+from django.db import transaction
 
 from .models import (
     Post, Comment, Like, Profile, UserPost, AVATAR_DEFAULT, CommentLike,
     UserPostLike, UserPostComment
 )
+from .comments import areplies_page, atop_level_comments, replies_page, top_level_comments
+from .exports import aexport_lines, export_lines, export_queryset, parse_day
+from .feed import amark_feed_likes, aprefetch_comments, mark_feed_likes, prefetch_comments, serialize_feed_item
 from .forms import ProfileForm, UserPostForm
+from .freshness import feed_last_modified, post_last_modified, profile_last_modified, profiles_last_modified
+from .likes import amark_liked, aset_like, desired_like, mark_liked, set_like, wants_json
+from .metrics import metrics_registry, record_upload
+from .pagecache import cache_stats, cached_page
+from .ratelimit import QUOTA_MESSAGE, quota_left, ratelimit, release_quota, take_quota
+from .replicas import read_from_replica
+from .search import search
+from .timelines import afeed_for, feed_for
+from .uploads import direct_uploads_enabled, presigned_upload
 
 
 # =========================
 # Feed principal
 # =========================
+@read_from_replica
+@cached_page("home", lambda: ["feed"], feed_last_modified)
 def home(request):
-    posts = Post.objects.filter(published=True).order_by("-created_at")
-    user_posts = (
-        UserPost.objects.filter(is_approved=True)
-        .select_related("user")
-        .order_by("-created_at")
-    )
-    combined = []
-    for p in posts:
-        combined.append({"type": "oficial", "obj": p})
-    for up in user_posts:
-        combined.append({"type": "usuario", "obj": up})
-    combined_posts = sorted(combined, key=lambda x: x["obj"].created_at, reverse=True)
-    return render(request, "core/home.html", {"combined_posts": combined_posts})
+    try:
+        page = feed_for(request.user, cursor=request.GET.get("cursor"))
+    except ValueError:
+        return HttpResponseBadRequest("Cursor inválido.")
+    mark_feed_likes(request.user, page.items)
+
+    context = {"combined_posts": page.items, "next_cursor": page.next_cursor}
+    if request.GET.get("partial"):
+        return render(request, "core/partials/feed_items.html", context)
+    return render(request, "core/home.html", context)
+
+
+@read_from_replica
+@cached_page("feed_json", lambda: ["feed"], feed_last_modified)
+def feed_json(request):
+    try:
+        page = feed_for(request.user, cursor=request.GET.get("cursor"))
+    except ValueError:
+        return JsonResponse({"error": "Cursor inválido."}, status=400)
+    mark_feed_likes(request.user, page.items)
+
+    return JsonResponse({
+        "results": [serialize_feed_item(item) for item in page.items],
+        "next_cursor": page.next_cursor,
+    })
 
 
 # =========================
 # Post + comentários
 # =========================
+@read_from_replica
+@cached_page("post_detail", lambda slug: [f"post:{slug}"], post_last_modified)
+@ratelimit("comment")
 def post_detail(request, slug):
     post = get_object_or_404(Post, slug=slug, published=True)
 
-    if request.method == "POST" and request.user.is_authenticated:
-        content = (request.POST.get("comment") or "").strip()
-        if content:
-            Comment.objects.create(post=post, user=request.user, content=content)
-            messages.success(request, "Comentário publicado!")
-            return redirect("post_detail", slug=post.slug)
+    if request.method == "POST":
+        response = _publish_comment(request, post)
+        if response:
+            return response
 
-    comments = Comment.objects.filter(post=post, parent__isnull=True).order_by("-created_at")
-    comments_count = Comment.objects.filter(post=post).count()
+    try:
+        page = top_level_comments(Comment, post, cursor=request.GET.get("cursor"))
+    except ValueError:
+        return HttpResponseBadRequest("Cursor inválido.")
+    mark_liked(CommentLike, request.user, page.items)
 
-    user_liked = (
-        request.user.is_authenticated
-        and Like.objects.filter(post=post, user=request.user).exists()
-    )
-    likes_count = post.likes.count()
+    if request.GET.get("partial"):
+        return render(
+            request,
+            "core/partials/comment_page.html",
+            {"post": post, "comments": page.items, "next_cursor": page.next_cursor},
+        )
+
+    user_liked = post.pk in mark_liked(Like, request.user, [post])
 
     return render(
         request,
         "core/post_detail.html",
         {
             "post": post,
-            "comments": comments,
-            "comments_count": comments_count,
+            "comments": page.items,
+            "next_cursor": page.next_cursor,
+            "comments_count": post.comments_count,
             "user_liked": user_liked,
-            "likes_count": likes_count,
+            "likes_count": post.likes_count,
         },
     )
 
 
+def _publish_comment(request, post):
+    if not request.user.is_authenticated:
+        return None
+    content = (request.POST.get("comment") or "").strip()
+    if not content:
+        return None
+    with transaction.atomic():
+        Comment.objects.create(post=post, user=request.user, content=content)
+    messages.success(request, "Comentário publicado!")
+    return redirect("post_detail", slug=post.slug)
+
+
+def comment_replies(request, comment_id):
+    parent = get_object_or_404(Comment, id=comment_id, post__published=True)
+    try:
+        page = replies_page(parent, cursor=request.GET.get("cursor"))
+    except ValueError:
+        return JsonResponse({"error": "Cursor inválido."}, status=400)
+    mark_liked(CommentLike, request.user, page.items)
+    return JsonResponse({"results": _reply_results(request, page.items), "next_cursor": page.next_cursor})
+
+
+def _reply_results(request, replies):
+    results = []
+    for reply in replies:
+        results.append({
+            "id": reply.pk,
+            "user": reply.user.username,
+            "content": reply.content,
+            "created_at": reply.created_at.isoformat(),
+            "likes_count": reply.likes_count,
+            "liked": reply.liked_by_me,
+            "replies_count": reply.replies_count,
+            "html": render_to_string(
+                "core/partials/comment_thread.html",
+                {"comment": reply, "interactive": True},
+                request=request,
+            ),
+        })
+    return results
+
+
 # =========================
 # Curtidas em posts
 # =========================
 @login_required
 @require_POST
+@ratelimit("like")
 def like_post(request, post_id):
     post = get_object_or_404(Post, id=post_id, published=True)
-    like, created = Like.objects.get_or_create(post=post, user=request.user)
-    if not created:
-        like.delete()
+    liked, count = set_like(Like, request.user, post, desired_like(request))
+    if wants_json(request):
+        return JsonResponse({"liked": liked, "count": count})
     return redirect("post_detail", slug=post.slug)
 
 
@@ -84,21 +171,24 @@ def like_post(request, post_id):
 # =========================
 @login_required
 @require_POST
+@ratelimit("like")
 def like_comment(request, comment_id):
-    comment = get_object_or_404(Comment, id=comment_id)
-    like, created = CommentLike.objects.get_or_create(comment=comment, user=request.user)
-    if not created:
-        like.delete()
+    comment = get_object_or_404(Comment.objects.select_related("post"), id=comment_id)
+    liked, count = set_like(CommentLike, request.user, comment, desired_like(request))
+    if wants_json(request):
+        return JsonResponse({"liked": liked, "count": count})
     return redirect("post_detail", slug=comment.post.slug)
 
 
 @login_required
 @require_POST
+@ratelimit("reply")
 def reply_comment(request, comment_id):
     parent = get_object_or_404(Comment, id=comment_id)
     content = (request.POST.get("comment") or "").strip()
     if content:
-        Comment.objects.create(post=parent.post, user=request.user, content=content, parent=parent)
+        with transaction.atomic():
+            Comment.objects.create(post=parent.post, user=request.user, content=content, parent=parent)
         messages.success(request, "Resposta publicada!")
     return redirect("post_detail", slug=parent.post.slug)
 
@@ -106,10 +196,14 @@ def reply_comment(request, comment_id):
 # =========================
 # Perfis
 # =========================
+@read_from_replica
+@cached_page("profile", lambda username: [f"profile:{username}"], profile_last_modified)
 def profile(request, username):
     profile_user = get_object_or_404(User, username=username)
     Profile.objects.get_or_create(user=profile_user, defaults={"avatar": AVATAR_DEFAULT})
-    user_posts = UserPost.objects.filter(user=profile_user).order_by("-created_at")
+    user_posts = list(UserPost.objects.filter(user=profile_user).order_by("-created_at"))
+    prefetch_comments([], user_posts)
+    mark_liked(UserPostLike, request.user, user_posts)
     return render(request, "core/profile.html", {"profile_user": profile_user, "user_posts": user_posts})
 
 
@@ -127,6 +221,8 @@ def edit_profile(request):
     return render(request, "core/edit_profile.html", {"form": form})
 
 
+@read_from_replica
+@cached_page("profiles_list", lambda: ["profiles"], profiles_last_modified)
 def profiles_list(request):
     profiles = Profile.objects.select_related("user").all()
     return render(request, "core/profiles_list.html", {"profiles": profiles})
@@ -136,19 +232,31 @@ def profiles_list(request):
 # Postagens da comunidade
 # =========================
 @login_required
+@ratelimit("post")
 def create_user_post(request):
-    last_post = UserPost.objects.filter(user=request.user).order_by("-created_at").first()
-    if last_post and last_post.created_at.date() == now().date():
-        messages.error(request, "Você só pode postar uma vez por dia.")
+    if not quota_left(request.user):
+        messages.error(request, QUOTA_MESSAGE)
         return redirect("profile", username=request.user.username)
 
     if request.method == "POST":
-        form = UserPostForm(request.POST, request.FILES)
+        form = UserPostForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
+            # Reserva só com o formulário válido: erro de validação não gasta o dia.
+            if not take_quota(request.user):
+                messages.error(request, QUOTA_MESSAGE)
+                return redirect("profile", username=request.user.username)
+            if "image" in request.FILES:
+                record_upload("servidor", request.FILES["image"].size)
             new_post = form.save(commit=False)
             new_post.user = request.user
             new_post.is_approved = False
-            new_post.save()
+            try:
+                new_post.save()
+            except Exception:
+                release_quota(request.user)
+                raise
+            # Solta a reserva quando a postagem já conta no banco
+            transaction.on_commit(lambda: release_quota(request.user))
             messages.success(
                 request,
                 "Sua postagem foi enviada com sucesso. Ela ficará visível no seu perfil, "
@@ -156,9 +264,29 @@ def create_user_post(request):
             )
             return redirect("profile", username=request.user.username)
     else:
-        form = UserPostForm()
+        form = UserPostForm(user=request.user)
 
-    return render(request, "core/user_post_form.html", {"form": form})
+    return render(
+        request,
+        "core/user_post_form.html",
+        {"form": form, "direct_upload": direct_uploads_enabled()},
+    )
+
+
+@login_required
+@require_POST
+@ratelimit("post")
+def user_post_upload_url(request):
+    if not direct_uploads_enabled():
+        return JsonResponse({"error": "Upload direto indisponível."}, status=404)
+    # Sem cota no dia, nada de URL: o envio nunca viraria postagem.
+    if not quota_left(request.user):
+        return JsonResponse({"error": QUOTA_MESSAGE}, status=429)
+    try:
+        upload = presigned_upload(request.user, request.POST.get("content_type", ""))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(upload)
 
 
 # =========================
@@ -166,20 +294,224 @@ def create_user_post(request):
 # =========================
 @login_required
 @require_POST
+@ratelimit("like")
 def like_user_post(request, post_id):
-    post = get_object_or_404(UserPost, id=post_id, is_approved=True)
-    like, created = UserPostLike.objects.get_or_create(post=post, user=request.user)
-    if not created:
-        like.delete()
+    post = get_object_or_404(UserPost.objects.select_related("user"), id=post_id, is_approved=True)
+    liked, count = set_like(UserPostLike, request.user, post, desired_like(request))
+    if wants_json(request):
+        return JsonResponse({"liked": liked, "count": count})
     return redirect("profile", username=post.user.username)
 
 
 @login_required
 @require_POST
+@ratelimit("comment")
 def comment_user_post(request, post_id):
     post = get_object_or_404(UserPost, id=post_id, is_approved=True)
     content = (request.POST.get("comment") or "").strip()
     if content:
-        UserPostComment.objects.create(post=post, user=request.user, content=content)
+        with transaction.atomic():
+            UserPostComment.objects.create(post=post, user=request.user, content=content)
         messages.success(request, "Comentário publicado!")
     return redirect("profile", username=post.user.username)
+
+
+# =========================
+# Busca
+# =========================
+def search_view(request):
+    query = request.GET.get("q", "").strip()
+    try:
+        page_number = int(request.GET.get("page", 1))
+    except ValueError:
+        page_number = 1
+
+    page = search(query, page_number) if query else None
+    return render(request, "core/search.html", {"query": query, "page": page})
+
+
+# =========================
+# Interno
+# =========================
+@staff_member_required
+def cache_stats_view(request):
+    return JsonResponse(cache_stats())
+
+
+@staff_member_required
+@read_from_replica
+def export_view(request, table):
+    fmt = request.GET.get("format", "csv")
+    try:
+        queryset, fields = export_queryset(
+            table, parse_day(request.GET.get("since")), parse_day(request.GET.get("until"))
+        )
+        lines = export_lines(queryset, fields, fmt)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    # Linha a linha direto do cursor: a memória não depende do tamanho da tabela.
+    if isinstance(request, ASGIRequest):
+        lines = aexport_lines(lines)
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(lines, content_type=f"{content_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{table}.{fmt}"'
+    return response
+
+
+def metrics_view(request):
+    # Token do scraper (Authorization: Bearer <METRICS_TOKEN>) ou usuário staff.
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    authorized = bool(token) and secrets.compare_digest(header, f"Bearer {token}")
+    if not authorized and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+# =========================
+# Variantes assíncronas (deploy ASGI, ASYNC_VIEWS=True em core/urls.py)
+# =========================
+# Mesmas respostas das views acima. Consultas independentes rodam juntas com
+# asyncio.gather; templates e escritas com transação ficam numa thread
+# (context processors e atributos preguiçosos ainda usam o ORM síncrono).
+arender = sync_to_async(render)
+
+
+@read_from_replica
+@cached_page("home", lambda: ["feed"], feed_last_modified)
+async def home_async(request):
+    user = await request.auser()
+    try:
+        page = await afeed_for(user, cursor=request.GET.get("cursor"))
+    except ValueError:
+        return HttpResponseBadRequest("Cursor inválido.")
+    await amark_feed_likes(user, page.items)
+
+    context = {"combined_posts": page.items, "next_cursor": page.next_cursor}
+    if request.GET.get("partial"):
+        return await arender(request, "core/partials/feed_items.html", context)
+    return await arender(request, "core/home.html", context)
+
+
+@read_from_replica
+@cached_page("feed_json", lambda: ["feed"], feed_last_modified)
+async def feed_json_async(request):
+    user = await request.auser()
+    try:
+        page = await afeed_for(user, cursor=request.GET.get("cursor"))
+    except ValueError:
+        return JsonResponse({"error": "Cursor inválido."}, status=400)
+    await amark_feed_likes(user, page.items)
+
+    return JsonResponse({
+        "results": [serialize_feed_item(item) for item in page.items],
+        "next_cursor": page.next_cursor,
+    })
+
+
+async def _alist(qs):
+    return [obj async for obj in qs]
+
+
+@read_from_replica
+@cached_page("post_detail", lambda slug: [f"post:{slug}"], post_last_modified)
+@ratelimit("comment")
+async def post_detail_async(request, slug):
+    post = await aget_object_or_404(Post, slug=slug, published=True)
+
+    if request.method == "POST":
+        response = await sync_to_async(_publish_comment)(request, post)
+        if response:
+            return response
+
+    user = await request.auser()
+    cursor = request.GET.get("cursor")
+    try:
+        if request.GET.get("partial"):
+            page = await atop_level_comments(Comment, post, cursor=cursor)
+            await amark_liked(CommentLike, user, page.items)
+            return await arender(
+                request,
+                "core/partials/comment_page.html",
+                {"post": post, "comments": page.items, "next_cursor": page.next_cursor},
+            )
+        # Comentários e estado da curtida não dependem um do outro.
+        page, liked_posts = await asyncio.gather(
+            atop_level_comments(Comment, post, cursor=cursor),
+            amark_liked(Like, user, [post]),
+        )
+    except ValueError:
+        return HttpResponseBadRequest("Cursor inválido.")
+    await amark_liked(CommentLike, user, page.items)
+
+    return await arender(
+        request,
+        "core/post_detail.html",
+        {
+            "post": post,
+            "comments": page.items,
+            "next_cursor": page.next_cursor,
+            "comments_count": post.comments_count,
+            "user_liked": post.pk in liked_posts,
+            "likes_count": post.likes_count,
+        },
+    )
+
+
+async def comment_replies_async(request, comment_id):
+    parent = await aget_object_or_404(Comment, id=comment_id, post__published=True)
+    try:
+        page = await areplies_page(parent, cursor=request.GET.get("cursor"))
+    except ValueError:
+        return JsonResponse({"error": "Cursor inválido."}, status=400)
+    await amark_liked(CommentLike, await request.auser(), page.items)
+    results = await sync_to_async(_reply_results)(request, page.items)
+    return JsonResponse({"results": results, "next_cursor": page.next_cursor})
+
+
+@read_from_replica
+@cached_page("profile", lambda username: [f"profile:{username}"], profile_last_modified)
+async def profile_async(request, username):
+    profile_user = await aget_object_or_404(User, username=username)
+    _, user_posts = await asyncio.gather(
+        Profile.objects.aget_or_create(user=profile_user, defaults={"avatar": AVATAR_DEFAULT}),
+        _alist(UserPost.objects.filter(user=profile_user).order_by("-created_at")),
+    )
+    await asyncio.gather(
+        aprefetch_comments([], user_posts),
+        amark_liked(UserPostLike, await request.auser(), user_posts),
+    )
+    return await arender(request, "core/profile.html", {"profile_user": profile_user, "user_posts": user_posts})
+
+
+@login_required
+@require_POST
+@ratelimit("like")
+async def like_post_async(request, post_id):
+    post = await aget_object_or_404(Post, id=post_id, published=True)
+    liked, count = await aset_like(Like, await request.auser(), post, desired_like(request))
+    if wants_json(request):
+        return JsonResponse({"liked": liked, "count": count})
+    return redirect("post_detail", slug=post.slug)
+
+
+@login_required
+@require_POST
+@ratelimit("like")
+async def like_comment_async(request, comment_id):
+    comment = await aget_object_or_404(Comment.objects.select_related("post"), id=comment_id)
+    liked, count = await aset_like(CommentLike, await request.auser(), comment, desired_like(request))
+    if wants_json(request):
+        return JsonResponse({"liked": liked, "count": count})
+    return redirect("post_detail", slug=comment.post.slug)
+
+
+@login_required
+@require_POST
+@ratelimit("like")
+async def like_user_post_async(request, post_id):
+    post = await aget_object_or_404(UserPost.objects.select_related("user"), id=post_id, is_approved=True)
+    liked, count = await aset_like(UserPostLike, await request.auser(), post, desired_like(request))
+    if wants_json(request):
+        return JsonResponse({"liked": liked, "count": count})
+    return redirect("profile", username=post.user.username)
@@ -0,0 +1,34 @@
+import os
+import shutil
+
+# =========================
+# WSGI ou ASGI
+# =========================
+# Suba só com "gunicorn" (este arquivo é lido automaticamente). Com
+# ASYNC_VIEWS=True os workers são uvicorn e servem as views assíncronas.
+if os.environ.get("ASYNC_VIEWS") == "True":
+    wsgi_app = "sqmbrasil.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "sqmbrasil.wsgi:application"
+
+# =========================
+# Métricas com vários workers (core/metrics.py)
+# =========================
+# Defina PROMETHEUS_MULTIPROC_DIR (ex.: /tmp/sqm-metrics) no ambiente do
+# gunicorn: cada worker grava seus valores lá e o /metrics soma todos.
+METRICS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def on_starting(server):
+    # Valores de uma execução anterior não podem somar na nova.
+    if METRICS_DIR:
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if METRICS_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -54,6 +54,8 @@ CRISPY_TEMPLATE_PACK = "tailwind"
 # Middlewares
 # =========================
 MIDDLEWARE = [
+    "core.profiling.RequestProfilingMiddleware",  # opt-in: REQUEST_PROFILING=True
+    "core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # serve estáticos no Render
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -62,9 +64,40 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "allauth.account.middleware.AccountMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "core.replicas.PrimaryPinningMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# =========================
+# Métricas Prometheus (/metrics)
+# =========================
+# Com vários workers, exporte PROMETHEUS_MULTIPROC_DIR (ver gunicorn.conf.py).
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True") == "True"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# =========================
+# Profiling por requisição (Server-Timing + logs estruturados)
+# =========================
+REQUEST_PROFILING = os.environ.get("REQUEST_PROFILING") == "True"
+REQUEST_PROFILING_SLOW_MS = float(os.environ.get("REQUEST_PROFILING_SLOW_MS", "500"))
+REQUEST_PROFILING_SLOW_QUERY_MS = float(os.environ.get("REQUEST_PROFILING_SLOW_QUERY_MS", "100"))
+# Fração das requisições rodadas sob cProfile; o .prof só é salvo se passar de SLOW_MS
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get("REQUEST_PROFILING_SAMPLE_RATE", "0"))
+REQUEST_PROFILING_DIR = os.environ.get("REQUEST_PROFILING_DIR", str(BASE_DIR / "profiles"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.profiling": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "core.tasks": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "core.ratelimit": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+    },
+}
+
 ROOT_URLCONF = "sqmbrasil.urls"
 
 TEMPLATES = [
@@ -95,6 +128,41 @@ DATABASES = {
     )
 }
 
+# Réplicas de leitura (opcional): DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+# Só as views marcadas com @read_from_replica leem delas (ver core/replicas.py).
+REPLICA_DATABASES = []
+for index, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), start=1):
+    alias = f"replica{index}"
+    DATABASES[alias] = dj_database_url.parse(url.strip(), conn_max_age=600)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+
+# Segundos em que o navegador lê do primário depois de escrever
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "15"))
+
+# =========================
+# Cache (páginas de visitantes anônimos)
+# =========================
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", "300"))
+
 # =========================
 # Validação de senha
 # =========================
@@ -158,6 +226,53 @@ else:
     MEDIA_URL = "/media/"
     MEDIA_ROOT = BASE_DIR / "media"
 
+# Tamanho máximo das imagens enviadas (também vale para o upload direto ao bucket)
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", str(10 * 1024 * 1024)))
+
+# =========================
+# Tarefas em segundo plano (e-mails, versões de imagens)
+# =========================
+# Em produção rode o worker: python manage.py run_tasks
+# Com TASKS_ALWAYS_EAGER as tarefas rodam na própria requisição, após o commit
+# (padrão em desenvolvimento, para não exigir o worker).
+TASKS_ALWAYS_EAGER = os.environ.get("TASKS_ALWAYS_EAGER", str(DEBUG)) == "True"
+# Segundos até uma tarefa "executando" ser considerada abandonada
+TASK_TIMEOUT = int(os.environ.get("TASK_TIMEOUT", "600"))
+
+# =========================
+# Limites de tentativas (core/ratelimit.py)
+# =========================
+# Janela deslizante por usuário ("N/s", "N/m", "N/h"); signup conta por IP.
+# Os contadores ficam no cache: com vários workers use REDIS_URL, porque o
+# LocMem conta por processo.
+RATE_LIMITS_ENABLED = os.environ.get("RATE_LIMITS_ENABLED", "True") == "True"
+RATE_LIMITS = {
+    "post": "5/h",
+    "comment": "10/m",
+    "reply": "10/m",
+    "like": "60/m",
+    "signup": "5/h",
+}
+# Só confie no X-Forwarded-For atrás de um proxy que o preenche (Render).
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "False") == "True"
+# Postagens da comunidade por dia (no fuso TIME_ZONE)
+DAILY_POST_QUOTA = int(os.environ.get("DAILY_POST_QUOTA", "1"))
+
+# =========================
+# Views assíncronas (ASGI)
+# =========================
+# ASYNC_VIEWS=True troca feed, post, perfil, respostas e curtidas pelas
+# variantes async (core/urls.py) e faz o gunicorn.conf.py subir workers
+# uvicorn com sqmbrasil.asgi. Desligado, tudo segue em WSGI como antes.
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "False") == "True"
+
+# =========================
+# Timelines (feed pré-calculado por usuário, core/timelines.py)
+# =========================
+# Ligado, cada post publicado/aprovado é distribuído pelo worker para a
+# timeline de cada usuário e o feed dos logados lê só a própria timeline.
+TIMELINES_ENABLED = os.environ.get("TIMELINES_ENABLED", "False") == "True"
+
 # =========================
 # Autenticação (allauth)
 # =========================
@@ -170,6 +285,7 @@ ACCOUNT_LOGIN_METHODS = {"email"}  # login só por e-mail
 ACCOUNT_SIGNUP_FIELDS = ["email*", "username*", "password1*", "password2*"]
 ACCOUNT_UNIQUE_EMAIL = True
 ACCOUNT_EMAIL_VERIFICATION = "optional"
+ACCOUNT_ADAPTER = "core.emails.AccountAdapter"  # envio de e-mails pela fila
 
 
 LOGIN_REDIRECT_URL = "/"
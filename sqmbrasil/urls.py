@@ -2,10 +2,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from allauth.account.views import SignupView
+
+from core.ratelimit import ip_key, ratelimit
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("core.urls")),
+    # Cadastro limitado por IP (vem antes do include para ter precedência)
+    path("accounts/signup/", ratelimit("signup", key=ip_key)(SignupView.as_view()), name="account_signup"),
     path("accounts/", include("allauth.urls")),  # ⬅️ allauth
 ]
 